@@ -0,0 +1,65 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+import mmap
+import os
+import time
+
+import psutil
+
+
+# Progress bar redraws land inside the timed run; opt in with MPMSUB_BENCH_PROGRESS=1
+PROGRESS_BAR = os.environ.get("MPMSUB_BENCH_PROGRESS") == "1"
+
+
+class MemSampler:
+    """Cache ``psutil.virtual_memory()`` for a short interval between reads."""
+
+    __slots__ = ("_interval", "_stamp", "_sample")
+
+    def __init__(self, interval=0.1):
+        self._interval = interval
+        self._stamp = float("-inf")
+        self._sample = None
+
+    def sample(self):
+        now = time.monotonic()
+        if now - self._stamp > self._interval:
+            self._sample = psutil.virtual_memory()
+            self._stamp = now
+        return self._sample
+
+    def used(self):
+        return self.sample().used
+
+    def available(self):
+        return self.sample().available
+
+
+memory = MemSampler()
+
+
+def available_cpus():
+    """Count the CPUs this process may run on, honouring affinity masks."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity is Linux-only
+        return psutil.cpu_count() or 1
+
+
+def allocate_resident(memory_mb):
+    """Allocate memory_mb of anonymous memory and make it resident."""
+    size = memory_mb * 1024 * 1024
+    if not hasattr(mmap, "MAP_ANONYMOUS"):
+        # Windows: no anonymous private mappings, fall back to a zeroed buffer
+        return bytearray(size)
+
+    # MAP_POPULATE (Linux) lets the kernel pre-fault every page in one call;
+    # elsewhere touch one byte per page with a single strided store
+    populate = getattr(mmap, "MAP_POPULATE", 0)
+    buf = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | populate)
+    if not populate:
+        buf[:: mmap.PAGESIZE] = b"\x01" * len(range(0, size, mmap.PAGESIZE))
+    return buf
@@ -7,106 +7,163 @@ like sequence alignment, assembly, and annotation that have varying
 CPU and memory requirements.
 """
 
+import functools
+import os
+import shutil
+import threading
 import time
 import sys
 import psutil
-import subprocess
 import tempfile
 import random
 import string
+from collections import Counter
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 # Add parent directory to import mpmsub
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import mpmsub
+from _common import PROGRESS_BAR, allocate_resident, available_cpus, memory
+
+# Maps every byte value onto a base; 256 is a multiple of 4 so bases stay uniform
+BASE_TABLE = bytes(b'ATGC'[i % 4] for i in range(256))
 
 
 def generate_fasta_file(filename, num_sequences=1000, seq_length=500):
     """Generate a fake FASTA file for testing."""
-    bases = ['A', 'T', 'G', 'C']
+    # Draw every base at once and map the random bytes onto A/T/G/C
+    total = num_sequences * seq_length
+    bases = random.getrandbits(8 * total).to_bytes(total, 'little').translate(BASE_TABLE)
     
-    with open(filename, 'w') as f:
-        for i in range(num_sequences):
-            f.write(f">sequence_{i}\n")
-            sequence = ''.join(random.choices(bases, k=seq_length))
-            f.write(f"{sequence}\n")
+    # Assemble the whole file in memory and emit it with one write
+    records = []
+    for i in range(num_sequences):
+        records.append(b">sequence_%d\n" % i)
+        records.append(bases[i * seq_length:(i + 1) * seq_length])
+        records.append(b"\n")
+    write_output(filename, b"".join(records))
 
 
-def create_alignment_job(input_file, output_file, memory_mb=500):
-    """Simulate a sequence alignment job (like BLAST or BWA)."""
-    script_content = f'''
-import time
-import random
+@functools.lru_cache(maxsize=None)
+def ensure_fasta(temp_dir, num_sequences=500, seq_length=500):
+    """Generate the shared input FASTA for a directory once per process."""
+    fasta_file = os.path.join(temp_dir, "sample_0.fasta")
+    generate_fasta_file(fasta_file, num_sequences, seq_length)
+    return fasta_file
 
-# Simulate memory allocation for alignment
-print("Loading reference genome...")
-reference_data = bytearray({memory_mb} * 1024 * 1024)  # {memory_mb}MB
 
-# Simulate alignment computation
-print("Performing alignment...")
-time.sleep(2 + random.uniform(0, 1))  # 2-3 seconds
+def prepare_input_files(temp_dir, num_samples, num_sequences=500):
+    """Create per-sample inputs as links to one shared FASTA file."""
+    base = os.path.join(temp_dir, '')
+    source = ensure_fasta(temp_dir, num_sequences)
+    input_files = [source]
+    for i in range(1, num_samples):
+        input_file = f"{base}sample_{i}.fasta"
+        if not os.path.exists(input_file):
+            try:
+                os.link(source, input_file)
+            except OSError:
+                shutil.copyfile(source, input_file)
+        input_files.append(input_file)
+    return input_files
 
-# Write fake output
-with open("{output_file}", "w") as f:
-    f.write("# Alignment results\\n")
-    f.write("query1\\tref_chr1\\t95.2\\t450\\n")
-    f.write("query2\\tref_chr2\\t87.1\\t380\\n")
 
-print("Alignment completed successfully!")
-'''
-    return script_content
+# Fake tool outputs, encoded once instead of on every job
+ALIGNMENT_OUTPUT = (
+    b"# Alignment results\n"
+    b"query1\tref_chr1\t95.2\t450\n"
+    b"query2\tref_chr2\t87.1\t380\n"
+)
+ASSEMBLY_OUTPUT = (
+    b">contig_1\n" + b"ATCGATCGATCGATCG" * 50 + b"\n"
+    b">contig_2\n" + b"GCTAGCTAGCTAGCTA" * 30 + b"\n"
+)
+ANNOTATION_OUTPUT = (
+    b"# Gene predictions\n"
+    b"gene1\tchr1\t1000\t2500\t+\thypothetical protein\n"
+    b"gene2\tchr1\t3000\t4200\t-\tkinase domain\n"
+)
 
 
-def create_assembly_job(input_file, output_file, memory_mb=1500):
-    """Simulate a genome assembly job (like SPAdes or Canu)."""
-    script_content = f'''
-import time
-import random
+def write_output(output_file, data):
+    """Write a job's whole output with one unbuffered write."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_CLOEXEC', 0)
+    fd = os.open(output_file, flags, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
 
-# Simulate memory allocation for assembly
-print("Loading sequencing reads...")
-read_data = bytearray({memory_mb} * 1024 * 1024)  # {memory_mb}MB
 
-# Simulate assembly computation (longer running)
-print("Performing de novo assembly...")
-time.sleep(4 + random.uniform(0, 2))  # 4-6 seconds
+def do_alignment(input_file, output_file, memory_mb=500):
+    """Simulate a sequence alignment job (like BLAST or BWA)."""
+    # Simulate memory allocation for alignment
+    reference_data = allocate_resident(memory_mb)
+    
+    # Simulate alignment computation
+    time.sleep(2 + random.uniform(0, 1))  # 2-3 seconds
+    
+    # Write fake output
+    write_output(output_file, ALIGNMENT_OUTPUT)
 
-# Write fake output
-with open("{output_file}", "w") as f:
-    f.write(">contig_1\\n")
-    f.write("ATCGATCGATCGATCG" * 50 + "\\n")
-    f.write(">contig_2\\n")
-    f.write("GCTAGCTAGCTAGCTA" * 30 + "\\n")
 
-print("Assembly completed successfully!")
-'''
-    return script_content
+def do_assembly(input_file, output_file, memory_mb=1500):
+    """Simulate a genome assembly job (like SPAdes or Canu)."""
+    # Simulate memory allocation for assembly
+    read_data = allocate_resident(memory_mb)
+    
+    # Simulate assembly computation (longer running)
+    time.sleep(4 + random.uniform(0, 2))  # 4-6 seconds
+    
+    # Write fake output
+    write_output(output_file, ASSEMBLY_OUTPUT)
 
 
-def create_annotation_job(input_file, output_file, memory_mb=800):
+def do_annotation(input_file, output_file, memory_mb=800):
     """Simulate a gene annotation job (like Augustus or GeneMark)."""
-    script_content = f'''
-import time
-import random
+    # Simulate memory allocation for annotation
+    genome_data = allocate_resident(memory_mb)
+    
+    # Simulate annotation computation
+    time.sleep(3 + random.uniform(0, 1.5))  # 3-4.5 seconds
+    
+    # Write fake output
+    write_output(output_file, ANNOTATION_OUTPUT)
+
+
+# Simulated job types, callable in-process or via worker_cmd()
+WORKLOADS = {
+    'alignment': do_alignment,
+    'assembly': do_assembly,
+    'annotation': do_annotation,
+}
+
 
-# Simulate memory allocation for annotation
-print("Loading genome and models...")
-genome_data = bytearray({memory_mb} * 1024 * 1024)  # {memory_mb}MB
+# Resolved once; every worker command re-runs this file as its entry point
+WORKER_SCRIPT = str(Path(__file__).resolve())
 
-# Simulate annotation computation
-print("Predicting genes...")
-time.sleep(3 + random.uniform(0, 1.5))  # 3-4.5 seconds
 
-# Write fake output
-with open("{output_file}", "w") as f:
-    f.write("# Gene predictions\\n")
-    f.write("gene1\\tchr1\\t1000\\t2500\\t+\\thypothetical protein\\n")
-    f.write("gene2\\tchr1\\t3000\\t4200\\t-\\tkinase domain\\n")
+def worker_cmd(job_type, input_file, output_file, memory_mb):
+    """Build the command that runs a simulated job in a fresh interpreter."""
+    return [sys.executable, WORKER_SCRIPT, job_type,
+            str(input_file), str(output_file), str(memory_mb)]
 
-print("Annotation completed successfully!")
-'''
-    return script_content
+
+def run_job(job_type, input_file, output_file, memory_mb):
+    """Run a simulated job inside a pool worker process."""
+    try:
+        start_time = time.time()
+        WORKLOADS[job_type](input_file, output_file, memory_mb)
+        runtime = time.time() - start_time
+        return {
+            'type': job_type,
+            'success': True,
+            'runtime': runtime
+        }
+    except Exception as e:
+        return {'type': job_type, 'success': False, 'error': str(e)}
 
 
 def run_bioinformatics_pipeline_naive(temp_dir, num_samples=6):
@@ -114,61 +171,64 @@ def run_bioinformatics_pipeline_naive(temp_dir, num_samples=6):
     print(f"🧬 Running bioinformatics pipeline (naive) with {num_samples} samples...")
     
     # Create input files
-    input_files = []
-    for i in range(num_samples):
-        input_file = temp_dir / f"sample_{i}.fasta"
-        generate_fasta_file(input_file, num_sequences=500)
-        input_files.append(input_file)
+    input_files = prepare_input_files(temp_dir, num_samples, num_sequences=500)
     
-    # Create job scripts
+    # Each sample gets: alignment + assembly + annotation
+    base = os.path.join(temp_dir, '')
     jobs = []
     for i, input_file in enumerate(input_files):
-        # Each sample gets: alignment + assembly + annotation
-        
-        # Alignment job (moderate memory)
-        align_script = temp_dir / f"align_{i}.py"
-        align_output = temp_dir / f"alignment_{i}.sam"
-        align_script.write_text(create_alignment_job(input_file, align_output, 500))
-        jobs.append(('alignment', [sys.executable, str(align_script)]))
-        
-        # Assembly job (high memory)
-        assembly_script = temp_dir / f"assembly_{i}.py"
-        assembly_output = temp_dir / f"assembly_{i}.fasta"
-        assembly_script.write_text(create_assembly_job(input_file, assembly_output, 1500))
-        jobs.append(('assembly', [sys.executable, str(assembly_script)]))
-        
-        # Annotation job (moderate-high memory)
-        annot_script = temp_dir / f"annotation_{i}.py"
-        annot_output = temp_dir / f"annotation_{i}.gff"
-        annot_script.write_text(create_annotation_job(input_file, annot_output, 800))
-        jobs.append(('annotation', [sys.executable, str(annot_script)]))
-    
-    def run_job(job_info):
-        job_type, cmd = job_info
-        try:
-            start_time = time.time()
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            runtime = time.time() - start_time
-            return {
-                'type': job_type,
-                'success': result.returncode == 0,
-                'runtime': runtime
-            }
-        except Exception as e:
-            return {'type': job_type, 'success': False, 'error': str(e)}
+        jobs.append(('alignment', input_file, f"{base}alignment_{i}.sam", 500))
+        jobs.append(('assembly', input_file, f"{base}assembly_{i}.fasta", 1500))
+        jobs.append(('annotation', input_file, f"{base}annotation_{i}.gff", 800))
     
     start_time = time.time()
-    start_memory = psutil.virtual_memory().used
+    start_memory = memory.used()
     
-    # Run with limited workers to prevent memory exhaustion
-    max_workers = min(4, psutil.cpu_count())
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(executor.map(run_job, jobs))
+    # Run with limited workers to prevent memory exhaustion; keep the workers
+    # warm across jobs but recycle them so freed arenas go back to the OS
+    max_workers = min(4, available_cpus())
+    pool_kwargs = {'max_tasks_per_child': 2} if sys.version_info >= (3, 11) else {}
+    slots = threading.Semaphore(max_workers)
+    futures = {}  # future -> job type
+    tally = Counter()
+    
+    def collect(done):
+        # Tally (type, success) pairs as jobs finish and drop their futures
+        for future in done:
+            job_type = futures.pop(future)
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # A worker was killed, likely by the OOM killer: the job failed
+                result = {'type': job_type, 'success': False}
+            tally[(result.get('type'), bool(result.get('success')))] += 1
+    
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs) as executor:
+        for job in jobs:
+            # Only queue a job once a worker is free and its memory would fit
+            slots.acquire()
+            collect([f for f in futures if f.done()])
+            needed = job[3] * 1024 * 1024
+            while memory.available() < needed and futures:
+                time.sleep(0.1)
+                collect([f for f in futures if f.done()])
+            
+            try:
+                future = executor.submit(run_job, *job)
+            except BrokenProcessPool:
+                # An earlier job's worker was killed; the pool runs nothing more
+                slots.release()
+                tally[(job[0], False)] += 1
+                continue
+            future.add_done_callback(lambda f: slots.release())
+            futures[future] = job[0]
+        
+        collect(as_completed(futures))
     
     total_time = time.time() - start_time
-    peak_memory = psutil.virtual_memory().used
+    peak_memory = memory.used()
     
-    successful = sum(1 for r in results if r.get('success', False))
+    successful = sum(count for (_, success), count in tally.items() if success)
     
     return {
         'method': 'naive_bioinformatics',
@@ -177,89 +237,69 @@ def run_bioinformatics_pipeline_naive(temp_dir, num_samples=6):
         'total_jobs': len(jobs),
         'memory_delta_mb': (peak_memory - start_memory) / (1024**2),
         'job_breakdown': {
-            'alignment': sum(1 for r in results if r.get('type') == 'alignment' and r.get('success')),
-            'assembly': sum(1 for r in results if r.get('type') == 'assembly' and r.get('success')),
-            'annotation': sum(1 for r in results if r.get('type') == 'annotation' and r.get('success'))
+            job_type: tally[(job_type, True)] for job_type in WORKLOADS
         }
     }
 
 
+# Per-sample stages for the mpmsub runner:
+# (type, id prefix, output prefix, output extension, workload MB, CPUs, memory limit)
+MPMSUB_JOB_SPECS = (
+    ('alignment', 'align', 'alignment', 'sam', 500, 1, '600M'),
+    ('assembly', 'assembly', 'assembly', 'fasta', 1500, 2, '1.8G'),
+    ('annotation', 'annotation', 'annotation', 'gff', 800, 1, '1G'),
+)
+
+
 def run_bioinformatics_pipeline_mpmsub(temp_dir, num_samples=6):
     """Run a bioinformatics pipeline using mpmsub."""
     print(f"🚀 Running bioinformatics pipeline (mpmsub) with {num_samples} samples...")
     
     # Create input files
-    input_files = []
-    for i in range(num_samples):
-        input_file = temp_dir / f"sample_{i}.fasta"
-        generate_fasta_file(input_file, num_sequences=500)
-        input_files.append(input_file)
+    input_files = prepare_input_files(temp_dir, num_samples, num_sequences=500)
     
     start_time = time.time()
-    start_memory = psutil.virtual_memory().used
+    start_memory = memory.used()
     
     # Create mpmsub cluster with memory limit
-    cluster = mpmsub.cluster(p=psutil.cpu_count(), m="4G", progress_bar=True)
+    cluster = mpmsub.cluster(p=available_cpus(), m="4G", progress_bar=PROGRESS_BAR)
     
-    # Add jobs with appropriate resource requirements
+    # Add jobs with appropriate resource requirements: alignment (moderate
+    # memory, 1 CPU), assembly (high memory, 2 CPUs) and annotation
+    # (moderate-high memory, 1 CPU) for every sample. Remember each job's
+    # type by id so results can be counted without parsing the id
+    base = os.path.join(temp_dir, '')
+    jobs = []
+    job_types = {}
     for i, input_file in enumerate(input_files):
-        # Alignment job (moderate memory, 1 CPU)
-        align_script = temp_dir / f"align_{i}.py"
-        align_output = temp_dir / f"alignment_{i}.sam"
-        align_script.write_text(create_alignment_job(input_file, align_output, 500))
-        cluster.jobs.append({
-            'cmd': [sys.executable, str(align_script)],
-            'p': 1,
-            'm': '600M',
-            'id': f'align_{i}'
-        })
-        
-        # Assembly job (high memory, 2 CPUs)
-        assembly_script = temp_dir / f"assembly_{i}.py"
-        assembly_output = temp_dir / f"assembly_{i}.fasta"
-        assembly_script.write_text(create_assembly_job(input_file, assembly_output, 1500))
-        cluster.jobs.append({
-            'cmd': [sys.executable, str(assembly_script)],
-            'p': 2,
-            'm': '1.8G',
-            'id': f'assembly_{i}'
-        })
-        
-        # Annotation job (moderate-high memory, 1 CPU)
-        annot_script = temp_dir / f"annotation_{i}.py"
-        annot_output = temp_dir / f"annotation_{i}.gff"
-        annot_script.write_text(create_annotation_job(input_file, annot_output, 800))
-        cluster.jobs.append({
-            'cmd': [sys.executable, str(annot_script)],
-            'p': 1,
-            'm': '1G',
-            'id': f'annotation_{i}'
-        })
+        for job_type, id_prefix, prefix, ext, memory_mb, cpus, memory_limit in MPMSUB_JOB_SPECS:
+            job_id = f'{id_prefix}_{i}'
+            job_types[job_id] = job_type
+            jobs.append({
+                'cmd': worker_cmd(job_type, input_file, f"{base}{prefix}_{i}.{ext}", memory_mb),
+                'p': cpus,
+                'm': memory_limit,
+                'id': job_id
+            })
+    cluster.jobs.extend(jobs)
     
     # Run the pipeline
     cluster.run()
     
     total_time = time.time() - start_time
-    peak_memory = psutil.virtual_memory().used
+    peak_memory = memory.used()
     
     successful = len(cluster.completed_jobs)
     
     # Count job types
-    job_breakdown = {'alignment': 0, 'assembly': 0, 'annotation': 0}
-    for job in cluster.completed_jobs:
-        job_id = job.get('id', '')
-        if 'align' in job_id:
-            job_breakdown['alignment'] += 1
-        elif 'assembly' in job_id:
-            job_breakdown['assembly'] += 1
-        elif 'annotation' in job_id:
-            job_breakdown['annotation'] += 1
+    tally = Counter(job_types[result.job_id] for result in cluster.completed_jobs)
+    job_breakdown = {job_type: tally[job_type] for job_type in WORKLOADS}
     
     return {
         'method': 'mpmsub_bioinformatics',
         'total_time': total_time,
         'successful_jobs': successful,
-        'total_jobs': len(cluster.jobs),
+        'total_jobs': len(jobs),
         'memory_delta_mb': (peak_memory - start_memory) / (1024**2),
         'job_breakdown': job_breakdown
     }
@@ -272,7 +312,7 @@ def main():
     
     # System info
     total_memory_gb = psutil.virtual_memory().total / (1024**3)
-    cpu_count = psutil.cpu_count()
+    cpu_count = available_cpus()
     
     print(f"System: {cpu_count} CPUs, {total_memory_gb:.1f}GB RAM")
     print()
@@ -287,16 +327,15 @@ def main():
     print(f"Total: {num_samples * 3} jobs")
     print()
     
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
+    # run_all_benchmarks.py points every benchmark at one shared (tmpfs) dir
+    with tempfile.TemporaryDirectory(dir=os.environ.get('MPMSUB_BENCH_TMPDIR')) as temp_dir:
         print("🔬 Running benchmarks...\n")
         
         # Test 1: Naive approach
         print("Test 1: Naive Parallel Execution")
         print("-" * 35)
         try:
-            naive_result = run_bioinformatics_pipeline_naive(temp_path, num_samples)
+            naive_result = run_bioinformatics_pipeline_naive(temp_dir, num_samples)
             print(f"   ✅ Completed: {naive_result['successful_jobs']}/{naive_result['total_jobs']} jobs")
             print(f"   ⏱️  Total time: {naive_result['total_time']:.1f}s")
             print(f"   🧠 Memory delta: {naive_result['memory_delta_mb']:.0f}MB")
@@ -310,7 +349,7 @@ def main():
         print("Test 2: mpmsub Memory-Aware Execution")
         print("-" * 40)
         try:
-            mpmsub_result = run_bioinformatics_pipeline_mpmsub(temp_path, num_samples)
+            mpmsub_result = run_bioinformatics_pipeline_mpmsub(temp_dir, num_samples)
             print(f"   ✅ Completed: {mpmsub_result['successful_jobs']}/{mpmsub_result['total_jobs']} jobs")
             print(f"   ⏱️  Total time: {mpmsub_result['total_time']:.1f}s")
             print(f"   🧠 Memory delta: {mpmsub_result['memory_delta_mb']:.0f}MB")
@@ -365,4 +404,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        # Invoked as a simulated job: <type> <input> <output> <memory_mb>
+        job_type, input_file, output_file, memory_mb = sys.argv[1:5]
+        WORKLOADS[job_type](input_file, output_file, int(memory_mb))
+    else:
+        main()
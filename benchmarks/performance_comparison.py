@@ -8,18 +8,75 @@ by comparing it against simple multiprocessing approaches.
 
 import time
 import json
+import math
+import multiprocessing
 import psutil
 import subprocess
-import multiprocessing as mp
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 import tempfile
-import os
 import sys
 
 # Add parent directory to path to import mpmsub
 sys.path.insert(0, str(Path(__file__).parent.parent))
 import mpmsub
+from _common import PROGRESS_BAR, allocate_resident, available_cpus, memory
+
+
+def memory_workload(mb_to_allocate, hold_seconds=2):
+    """Allocate memory and hold it for a bit to simulate real work."""
+    data = allocate_resident(mb_to_allocate)
+    time.sleep(hold_seconds)
+    return mb_to_allocate
+
+
+def cpu_workload(duration, batch=10000):
+    """Burn CPU for the given number of seconds."""
+    # Spend the time on arithmetic and only consult the clock once per batch
+    deadline = time.monotonic() + duration
+    sqrt = math.sqrt
+    result = 0.0
+    while time.monotonic() < deadline:
+        for i in range(batch):
+            result += sqrt(i * 1.2345)
+    return result
+
+
+# Simulated job types, callable in-process or via worker_cmd()
+WORKLOADS = {
+    "memory": memory_workload,
+    "cpu": cpu_workload,
+}
+
+
+# Resolved once; every worker command re-runs this file as its entry point
+WORKER_SCRIPT = str(Path(__file__).resolve())
+
+
+def worker_cmd(job_type, arg):
+    """Build the command that runs a simulated job in a fresh interpreter."""
+    return [sys.executable, WORKER_SCRIPT, job_type, str(arg)]
+
+
+def succeeded(future):
+    """Whether a pool job succeeded; one whose worker was killed failed."""
+    try:
+        return future.result()["success"]
+    except BrokenProcessPool:
+        # The OOM killer took the worker (and the pool with it)
+        return False
+
+
+def run_task(job):
+    """Run a job's in-process task inside a pool worker process."""
+    func, args = job["task"]
+    try:
+        func(*args)
+        return {"success": True, "id": job["id"]}
+    except Exception as e:
+        return {"success": False, "id": job["id"], "error": str(e)}
 
 
 class PerformanceBenchmark:
@@ -32,29 +89,15 @@ class PerformanceBenchmark:
         
     def create_memory_intensive_jobs(self, num_jobs=20, memory_per_job="500M"):
         """Create jobs that allocate significant memory."""
+        # Every job runs the same workload, so build its command and task once
+        mb_to_allocate = mpmsub.parse_memory_string(memory_per_job)
+        cmd = worker_cmd("memory", mb_to_allocate)
+        task = (memory_workload, (mb_to_allocate,))
         jobs = []
         for i in range(num_jobs):
-            # Python script that allocates memory and holds it
-            script = f"""
-import time
-import sys
-
-# Allocate {memory_per_job} of memory
-mb_to_allocate = {mpmsub.parse_memory_string(memory_per_job) // (1024*1024)}
-data = bytearray(mb_to_allocate * 1024 * 1024)
-
-# Hold memory for a bit to simulate real work
-time.sleep(2)
-
-print(f"Job {{i}} completed with {{mb_to_allocate}}MB")
-"""
-            
-            # Write script to temp file
-            script_file = self.output_dir / f"memory_job_{i}.py"
-            script_file.write_text(script)
-            
             jobs.append({
-                "cmd": [sys.executable, str(script_file)],
+                "cmd": cmd,
+                "task": task,
                 "p": 1,
                 "m": memory_per_job,
                 "id": f"memory_job_{i}"
@@ -63,26 +106,13 @@ print(f"Job {{i}} completed with {{mb_to_allocate}}MB")
     
     def create_cpu_intensive_jobs(self, num_jobs=10, duration=3):
         """Create CPU-intensive jobs."""
+        cmd = worker_cmd("cpu", duration)
+        task = (cpu_workload, (duration,))
         jobs = []
         for i in range(num_jobs):
-            script = f"""
-import time
-import math
-
-# CPU-intensive calculation
-start = time.time()
-result = 0
-while time.time() - start < {duration}:
-    result += math.sqrt(time.time())
-
-print(f"CPU job {{i}} completed: {{result:.2f}}")
-"""
-            
-            script_file = self.output_dir / f"cpu_job_{i}.py"
-            script_file.write_text(script)
-            
             jobs.append({
-                "cmd": [sys.executable, str(script_file)],
+                "cmd": cmd,
+                "task": task,
                 "p": 2,  # Request 2 CPUs
                 "m": "100M",
                 "id": f"cpu_job_{i}"
@@ -92,7 +122,7 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
     def benchmark_mpmsub(self, jobs, max_cpus=None, max_memory=None):
         """Benchmark mpmsub execution."""
         if max_cpus is None:
-            max_cpus = psutil.cpu_count()
+            max_cpus = available_cpus()
         if max_memory is None:
             max_memory = f"{int(psutil.virtual_memory().total * 0.8 / (1024**3))}G"
             
@@ -100,17 +130,16 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
         print(f"   Resources: {max_cpus} CPUs, {max_memory} memory")
         
         start_time = time.time()
-        start_memory = psutil.virtual_memory().used
+        start_memory = memory.used()
         
         # Run with mpmsub
-        cluster = mpmsub.cluster(p=max_cpus, m=max_memory, progress_bar=True)
-        for job in jobs:
-            cluster.jobs.append(job)
+        cluster = mpmsub.cluster(p=max_cpus, m=max_memory, progress_bar=PROGRESS_BAR)
+        cluster.jobs.extend(jobs)
         
         results = cluster.run()
         
         end_time = time.time()
-        end_memory = psutil.virtual_memory().used
+        end_memory = memory.used()
         
         return {
             "method": "mpmsub",
@@ -118,42 +147,38 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
             "peak_memory_delta": max(0, end_memory - start_memory),
             "jobs_completed": len(cluster.completed_jobs),
             "jobs_failed": len(cluster.failed_jobs),
-            "avg_job_time": sum(j.get('runtime', 0) for j in cluster.completed_jobs) / max(1, len(cluster.completed_jobs)),
-            "memory_efficiency": cluster.completed_jobs[0].get('memory_used', 0) if cluster.completed_jobs else 0
+            "avg_job_time": sum(j.runtime for j in cluster.completed_jobs) / max(1, len(cluster.completed_jobs)),
+            "memory_efficiency": cluster.completed_jobs[0].memory_used if cluster.completed_jobs else 0
         }
     
     def benchmark_naive_parallel(self, jobs, max_workers=None):
-        """Benchmark naive parallel execution using ThreadPoolExecutor."""
+        """Benchmark naive parallel execution using ProcessPoolExecutor."""
         if max_workers is None:
-            max_workers = psutil.cpu_count()
+            max_workers = available_cpus()
             
         print(f"⚡ Running naive parallel benchmark with {len(jobs)} jobs...")
         print(f"   Max workers: {max_workers}")
         
         start_time = time.time()
-        start_memory = psutil.virtual_memory().used
-        
-        def run_job(job):
-            try:
-                result = subprocess.run(job["cmd"], capture_output=True, text=True, timeout=60)
-                return {"success": result.returncode == 0, "job": job}
-            except Exception as e:
-                return {"success": False, "job": job, "error": str(e)}
-        
-        completed = 0
-        failed = 0
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            results = list(executor.map(run_job, jobs))
+        start_memory = memory.used()
+        
+        # Recycle each worker after one job so memory-heavy tasks release
+        # their allocations before the next job starts
+        # Count results as they arrive rather than collecting them all first
+        if sys.version_info >= (3, 11):
+            with ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=1) as executor:
+                futures = [executor.submit(run_task, job) for job in jobs]
+                tally = Counter(succeeded(future) for future in as_completed(futures))
+        else:
+            # ProcessPoolExecutor only gained max_tasks_per_child in 3.11
+            with multiprocessing.Pool(max_workers, maxtasksperchild=1) as pool:
+                tally = Counter(result["success"] for result in pool.imap_unordered(run_task, jobs))
             
-        for result in results:
-            if result["success"]:
-                completed += 1
-            else:
-                failed += 1
+        completed = tally[True]
+        failed = tally[False]
         
         end_time = time.time()
-        end_memory = psutil.virtual_memory().used
+        end_memory = memory.used()
         
         return {
             "method": "naive_parallel",
@@ -170,14 +195,24 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
         print(f"🐌 Running sequential benchmark with {len(jobs)} jobs...")
         
         start_time = time.time()
-        start_memory = psutil.virtual_memory().used
+        start_memory = memory.used()
         
         completed = 0
         failed = 0
         
         for job in jobs:
             try:
-                result = subprocess.run(job["cmd"], capture_output=True, text=True, timeout=60)
+                # Only the exit status matters, so skip pipe setup and decoding.
+                # Python's own descriptors are non-inheritable already, and
+                # leaving close_fds off lets CPython use posix_spawn (vfork)
+                # instead of fork for the absolute-path interpreter command
+                result = subprocess.run(
+                    job["cmd"],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    close_fds=False,
+                    timeout=60,
+                )
                 if result.returncode == 0:
                     completed += 1
                 else:
@@ -186,7 +221,7 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
                 failed += 1
         
         end_time = time.time()
-        end_memory = psutil.virtual_memory().used
+        end_memory = memory.used()
         
         return {
             "method": "sequential",
@@ -205,12 +240,13 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
         print("="*60)
         
         # Create jobs that would exceed system memory if run naively
-        available_memory = psutil.virtual_memory().available
+        available_mb = memory.available() // (1024**2)
         job_memory = "800M"  # Each job wants 800MB
-        num_jobs = min(20, int(available_memory / mpmsub.parse_memory_string(job_memory)) + 5)  # Intentionally over-allocate
+        job_memory_mb = mpmsub.parse_memory_string(job_memory)
+        num_jobs = min(20, int(available_mb / job_memory_mb) + 5)  # Intentionally over-allocate
         
         print(f"Creating {num_jobs} jobs requiring {job_memory} each")
-        print(f"Total requested: {num_jobs * 800}MB, Available: {available_memory // (1024**2)}MB")
+        print(f"Total requested: {num_jobs * job_memory_mb}MB, Available: {available_mb}MB")
         
         jobs = self.create_memory_intensive_jobs(num_jobs, job_memory)
         
@@ -266,9 +302,12 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
         
         job_counts = [5, 10, 20, 30]
         
+        # Jobs only differ by id, so build the largest batch once and slice it
+        all_jobs = self.create_memory_intensive_jobs(max(job_counts), "200M")
+        
         for count in job_counts:
             print(f"\nTesting with {count} jobs...")
-            jobs = self.create_memory_intensive_jobs(count, "200M")
+            jobs = all_jobs[:count]
             
             # Only test mpmsub and naive for scalability
             for method_name, benchmark_func in [
@@ -288,7 +327,7 @@ print(f"CPU job {{i}} completed: {{result:.2f}}")
         
         # Add system info
         self.results["system_info"] = {
-            "cpu_count": psutil.cpu_count(),
+            "cpu_count": available_cpus(),
             "memory_total": psutil.virtual_memory().total,
             "python_version": sys.version,
             "mpmsub_version": getattr(mpmsub, "__version__", "development")
@@ -370,11 +409,12 @@ def main():
         print(f"\n❌ Benchmark failed: {e}")
         import traceback
         traceback.print_exc()
-    finally:
-        # Cleanup temp files
-        for script_file in benchmark.output_dir.glob("*_job_*.py"):
-            script_file.unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        # Invoked as a simulated job: <type> <arg>
+        job_type, arg = sys.argv[1:3]
+        WORKLOADS[job_type](int(arg))
+    else:
+        main()
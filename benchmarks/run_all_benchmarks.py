@@ -6,13 +6,16 @@ This script executes all available benchmarks and provides a comprehensive
 performance comparison between mpmsub and naive parallel execution.
 """
 
+import os
 import sys
 import time
+import shutil
+import tempfile
 import subprocess
 from pathlib import Path
 
 
-def run_benchmark(script_name, description):
+def run_benchmark(script_name, description, env=None):
     """Run a single benchmark script and capture results."""
     print(f"\n{'='*60}")
     print(f"🚀 {description}")
@@ -23,14 +26,17 @@ def run_benchmark(script_name, description):
     script_path = Path(__file__).parent / script_name
     
     try:
-        start_time = time.time()
+        # The child writes straight to our stdout; flush the banner once so
+        # it still comes first when stdout is a file or pipe
+        sys.stdout.flush()
+        start_ns = time.perf_counter_ns()
         result = subprocess.run(
             [sys.executable, str(script_path)],
             capture_output=False,  # Show output in real-time
-            text=True,
-            timeout=1800  # 30 minute timeout
+            timeout=1800,  # 30 minute timeout
+            env=env
         )
-        runtime = time.time() - start_time
+        runtime = (time.perf_counter_ns() - start_ns) / 1e9
         
         if result.returncode == 0:
             print(f"\n✅ {description} completed successfully in {runtime:.1f}s")
@@ -98,19 +104,28 @@ def main():
         print("\nBenchmark suite cancelled.")
         sys.exit(0)
     
-    # Run benchmarks
-    start_time = time.time()
+    # Run benchmarks, all sharing one scratch directory (in RAM when /dev/shm
+    # is available) that is removed once at the end
+    shared_tmp = tempfile.mkdtemp(
+        prefix="mpmsub_bench_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None
+    )
+    env = {**os.environ, "MPMSUB_BENCH_TMPDIR": shared_tmp}
+    env.setdefault("MPMSUB_BENCH_PROGRESS", "0")  # keep redraws out of timings
+    start_ns = time.perf_counter_ns()
     results = []
     
-    for script_name, description in benchmarks:
-        try:
-            success = run_benchmark(script_name, description)
-            results.append((description, success))
-        except KeyboardInterrupt:
-            print(f"\n⚠️  Benchmark suite interrupted by user")
-            break
-    
-    total_time = time.time() - start_time
+    try:
+        for script_name, description in benchmarks:
+            try:
+                success = run_benchmark(script_name, description, env=env)
+                results.append((description, success))
+            except KeyboardInterrupt:
+                print(f"\n⚠️  Benchmark suite interrupted by user")
+                break
+    finally:
+        shutil.rmtree(shared_tmp, ignore_errors=True)
+    
+    total_time = (time.perf_counter_ns() - start_ns) / 1e9
     
     # Summary
     print(f"\n{'='*60}")
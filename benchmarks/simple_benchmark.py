@@ -6,80 +6,204 @@ This script creates a realistic scenario where mpmsub's memory-aware
 scheduling provides clear advantages over naive parallel execution.
 """
 
+import os
+import selectors
 import time
 import sys
 import psutil
 import subprocess
-import tempfile
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
-# Add parent directory to import mpmsub
-sys.path.insert(0, str(Path(__file__).parent.parent))
-import mpmsub
+try:
+    import mpmsub
+except ImportError:
+    # Not installed: add parent directory to import mpmsub
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    import mpmsub
+from _common import PROGRESS_BAR
 
+# System facts used throughout the run; read once
+CPU_COUNT = psutil.cpu_count()
+TOTAL_MEMORY_GB = psutil.virtual_memory().total / (1024**3)
 
-def create_memory_hog_script(memory_mb, duration_sec):
-    """Create a Python script that allocates memory and runs for a specified time."""
-    script_content = f"""
+
+# Source for a job that allocates memory_mb and holds it for duration_sec;
+# filled in with str.format() so the text is only laid out once
+MEMORY_HOG_TEMPLATE = """
+import mmap
 import time
 import sys
 
-# Allocate {memory_mb}MB of memory
-print(f"Allocating {memory_mb}MB of memory...")
-data = bytearray({memory_mb} * 1024 * 1024)
+# Allocate {memory_mb}MB of memory; MAP_POPULATE has the kernel pre-fault it,
+# elsewhere touch one byte per page so it is resident without a full memset
+print("Allocating {memory_mb}MB of memory...")
+size = {memory_mb} * 1024 * 1024
+populate = getattr(mmap, "MAP_POPULATE", 0)
+data = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | populate)
+if not populate:
+    data[::mmap.PAGESIZE] = b"\\x01" * len(range(0, size, mmap.PAGESIZE))
 
 # Simulate some work
-print(f"Working for {duration_sec} seconds...")
+print("Working for {duration_sec} seconds...")
 time.sleep({duration_sec})
 
-print(f"Job completed successfully!")
+print("Job completed successfully!")
 """
-    return script_content
 
 
-def run_naive_parallel(jobs, max_workers=4):
-    """Run jobs using naive ThreadPoolExecutor (no memory awareness)."""
-    print(f"🔥 Running {len(jobs)} jobs with naive parallel execution...")
-    print(f"   Max workers: {max_workers} (no memory limits)")
-
-    def run_single_job(job_info):
-        job_id, cmd = job_info
-        try:
-            start_time = time.time()
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            runtime = time.time() - start_time
-            return {
+def create_memory_hog_script(memory_mb, duration_sec):
+    """Create a Python script that allocates memory and runs for a specified time."""
+    return MEMORY_HOG_TEMPLATE.format(memory_mb=memory_mb, duration_sec=duration_sec)
+
+
+# ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+MAXRSS_PER_MB = 1024 * 1024 if sys.platform == "darwin" else 1024
+
+# How often run_fanout samples the combined memory of its running children
+PSS_SAMPLE_NS = 100_000_000
+
+
+def _pss_kb(pid):
+    """Return a process's proportional set size in kB (0 if unavailable)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "rb") as f:
+            for line in f:
+                if line.startswith(b"Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass  # exited, already reaped, or not Linux
+    return 0
+
+
+def run_fanout(jobs, max_workers=4, timeout=30, stats=None):
+    """Run commands with up to max_workers at once, all managed from one thread.
+
+    Every child's stdout pipe is registered with a single selector, so one
+    loop drains output, notices completions and enforces timeouts instead of
+    parking a thread inside subprocess.run() for each job. Nothing reads
+    stderr, so it goes straight to DEVNULL.
+
+    Results are yielded in completion order as soon as each job finishes,
+    rather than after the slowest one. If a stats dict is given, the loop
+    also samples the summed PSS of the running children and records the
+    peak as stats["peak_total_mb"].
+    """
+    selector = selectors.DefaultSelector()
+    timeout_ns = int(timeout * 1e9)
+    next_job = 0  # jobs are started in order; the index doubles as the job id
+    running = {}
+    results = []  # finished since the last yield
+    next_sample_ns = 0
+    if stats is not None:
+        stats["peak_total_mb"] = 0
+
+    def finish(proc, **result):
+        state = running.pop(proc)
+        if not proc.stdout.closed:
+            selector.unregister(proc.stdout)
+            proc.stdout.close()
+        result.setdefault("runtime_ns", time.perf_counter_ns() - state["start"])
+        results.append({"id": state["id"], **result})
+
+    while next_job < len(jobs) or running:
+        yield from results
+        results.clear()
+
+        while next_job < len(jobs) and len(running) < max_workers:
+            job_id = next_job
+            next_job += 1
+            try:
+                proc = subprocess.Popen(
+                    jobs[job_id], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                )
+            except Exception as e:
+                results.append({"id": job_id, "success": False, "error": str(e)})
+                continue
+            running[proc] = {
                 "id": job_id,
-                "success": result.returncode == 0,
-                "runtime": runtime,
-                "output": result.stdout.strip(),
+                "start": time.perf_counter_ns(),
+                "deadline": time.perf_counter_ns() + timeout_ns,
+                "stdout": [],
             }
-        except subprocess.TimeoutExpired:
-            return {"id": job_id, "success": False, "error": "timeout"}
-        except Exception as e:
-            return {"id": job_id, "success": False, "error": str(e)}
+            selector.register(proc.stdout, selectors.EVENT_READ, proc)
+
+        if not running:
+            continue
+
+        if stats is not None and time.perf_counter_ns() >= next_sample_ns:
+            total_mb = sum(_pss_kb(proc.pid) for proc in running) / 1024
+            stats["peak_total_mb"] = max(stats["peak_total_mb"], total_mb)
+            next_sample_ns = time.perf_counter_ns() + PSS_SAMPLE_NS
+
+        wait_ns = min(state["deadline"] for state in running.values())
+        if stats is not None:
+            wait_ns = min(wait_ns, next_sample_ns)
+        wait_ns -= time.perf_counter_ns()
+        for key, _ in selector.select(max(0, wait_ns) / 1e9):
+            proc = key.data
+            state = running[proc]
+            data = os.read(key.fd, 65536)
+            if data:
+                state["stdout"].append(data)
+                continue
+
+            # EOF on stdout: the child has exited (or is about to), so reap it
+            # with wait4() so the kernel reports the job's peak RSS
+            _, status, usage = os.wait4(proc.pid, 0)
+            if os.WIFSIGNALED(status):
+                proc.returncode = -os.WTERMSIG(status)
+            else:
+                proc.returncode = os.WEXITSTATUS(status)
+            finish(
+                proc,
+                success=proc.returncode == 0,
+                output=b"".join(state["stdout"]).decode().strip(),
+                peak_rss_mb=usage.ru_maxrss / MAXRSS_PER_MB,
+            )
+
+        now = time.perf_counter_ns()
+        for proc in [p for p, state in running.items() if state["deadline"] <= now]:
+            proc.kill()
+            proc.wait()
+            finish(proc, success=False, error="timeout")
 
-    start_time = time.time()
-    start_memory = psutil.virtual_memory().used
+    selector.close()
+    yield from results
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(executor.map(run_single_job, enumerate(jobs)))
 
-    total_time = time.time() - start_time
-    peak_memory = psutil.virtual_memory().used
+def run_naive_parallel(jobs, max_workers=4):
+    """Run jobs using naive parallel execution (no memory awareness)."""
+    print(f"🔥 Running {len(jobs)} jobs with naive parallel execution...")
+    print(f"   Max workers: {max_workers} (no memory limits)")
 
-    successful = sum(1 for r in results if r.get("success", False))
+    start_ns = time.perf_counter_ns()
+
+    successful = 0
+    peak_job_mb = 0
+    first_finish = None
+    stats = {}
+    for r in run_fanout(jobs, max_workers=max_workers, timeout=30, stats=stats):
+        if first_finish is None:
+            first_finish = (time.perf_counter_ns() - start_ns) / 1e9
+        successful += r.get("success", False)
+        peak_job_mb = max(peak_job_mb, r.get("peak_rss_mb", 0))
+
+    total_time = (time.perf_counter_ns() - start_ns) / 1e9
 
     print(f"   ✅ Completed: {successful}/{len(jobs)} jobs")
     print(f"   ⏱️  Total time: {total_time:.1f}s")
-    print(f"   🧠 Memory delta: {(peak_memory - start_memory) / (1024**2):.0f}MB")
+    if first_finish is not None:
+        print(f"   🏁 First job finished: {first_finish:.1f}s")
+    print(f"   🧠 Peak job RSS: {peak_job_mb:.0f}MB")
+    if stats["peak_total_mb"]:
+        print(f"   🧠 Peak combined PSS: {stats['peak_total_mb']:.0f}MB")
 
     return {
         "method": "naive_parallel",
         "total_time": total_time,
         "successful_jobs": successful,
-        "memory_delta_mb": (peak_memory - start_memory) / (1024**2),
+        "peak_job_mb": peak_job_mb,
+        "peak_total_mb": stats["peak_total_mb"],
     }
 
 
@@ -88,40 +212,41 @@ def run_mpmsub(jobs, max_memory="2G", memory_per_job=800):
     print(f"🚀 Running {len(jobs)} jobs with mpmsub...")
     print(f"   Memory limit: {max_memory}")
 
-    start_time = time.time()
-    start_memory = psutil.virtual_memory().used
+    start_ns = time.perf_counter_ns()
 
     # Create mpmsub cluster
-    cluster = mpmsub.cluster(p=psutil.cpu_count(), m=max_memory, progress_bar=True)
+    cluster = mpmsub.cluster(p=CPU_COUNT, m=max_memory, progress_bar=PROGRESS_BAR)
 
     # Add jobs
-    for i, cmd in enumerate(jobs):
-        cluster.jobs.append(
+    cluster.jobs.extend(
+        [
             {
                 "cmd": cmd,
                 "p": 1,
                 "m": f"{memory_per_job + 100}M",  # Each job needs memory + buffer
                 "id": f"job_{i}",
             }
-        )
+            for i, cmd in enumerate(jobs)
+        ]
+    )
 
     # Run jobs
     cluster.run()
 
-    total_time = time.time() - start_time
-    peak_memory = psutil.virtual_memory().used
+    total_time = (time.perf_counter_ns() - start_ns) / 1e9
+    peak_job_mb = max((r.memory_used for r in cluster.completed_jobs), default=0)
 
     successful = len(cluster.completed_jobs)
 
     print(f"   ✅ Completed: {successful}/{len(jobs)} jobs")
     print(f"   ⏱️  Total time: {total_time:.1f}s")
-    print(f"   🧠 Memory delta: {(peak_memory - start_memory) / (1024**2):.0f}MB")
+    print(f"   🧠 Peak job RSS: {peak_job_mb:.0f}MB")
 
     return {
         "method": "mpmsub",
         "total_time": total_time,
         "successful_jobs": successful,
-        "memory_delta_mb": (peak_memory - start_memory) / (1024**2),
+        "peak_job_mb": peak_job_mb,
     }
 
 
@@ -130,16 +255,12 @@ def main():
     print("🎯 mpmsub Performance Demonstration")
     print("=" * 50)
 
-    # Get system info
-    total_memory_gb = psutil.virtual_memory().total / (1024**3)
-    cpu_count = psutil.cpu_count()
-
-    print(f"System: {cpu_count} CPUs, {total_memory_gb:.1f}GB RAM")
+    print(f"System: {CPU_COUNT} CPUs, {TOTAL_MEMORY_GB:.1f}GB RAM")
     print()
 
     # Create a scenario where memory matters
     # Scale based on available memory to ensure we create pressure
-    available_gb = total_memory_gb * 0.7  # Use 70% of available memory
+    available_gb = TOTAL_MEMORY_GB * 0.7  # Use 70% of available memory
     memory_per_job = max(500, int(available_gb * 1024 / 6))  # MB per job
     num_jobs = max(
         6, int(available_gb * 1024 / memory_per_job * 1.5)
@@ -154,108 +275,95 @@ def main():
     )
     print()
 
-    # Create temporary scripts
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-
-        # Create job scripts
-        jobs = []
-        for i in range(num_jobs):
-            script_content = create_memory_hog_script(memory_per_job, job_duration)
-            script_file = temp_path / f"job_{i}.py"
-            script_file.write_text(script_content)
-            jobs.append([sys.executable, str(script_file)])
-
-        print("🔬 Running benchmarks...\n")
-
-        # Test 1: Naive parallel execution
-        print("Test 1: Naive Parallel Execution")
-        print("-" * 35)
-        try:
-            naive_result = run_naive_parallel(jobs, max_workers=4)
-        except Exception as e:
-            print(f"❌ Naive parallel failed: {e}")
-            naive_result = None
-
-        print()
-
-        # Test 2: mpmsub with memory awareness
-        print("Test 2: mpmsub Memory-Aware Execution")
-        print("-" * 40)
-        try:
-            mpmsub_result = run_mpmsub(
-                jobs, max_memory="2G", memory_per_job=memory_per_job
-            )
-        except Exception as e:
-            print(f"❌ mpmsub failed: {e}")
-            mpmsub_result = None
-
-        print()
-
-        # Compare results
-        print("📊 COMPARISON RESULTS")
-        print("=" * 25)
-
-        if naive_result and mpmsub_result:
-            naive_time = naive_result["total_time"]
-            mpmsub_time = mpmsub_result["total_time"]
-
-            if naive_time > 0 and mpmsub_time > 0:
-                speedup = naive_time / mpmsub_time
-                efficiency = (
-                    mpmsub_result["successful_jobs"] / naive_result["successful_jobs"]
-                    if naive_result["successful_jobs"] > 0
-                    else float("inf")
-                )
+    # Every job runs the same source, handed to the interpreter with -c, so
+    # build it once; nothing touches disk
+    script_content = create_memory_hog_script(memory_per_job, job_duration)
+    jobs = [[sys.executable, "-c", script_content] for _ in range(num_jobs)]
 
-                print(f"⏱️  Execution Time:")
-                print(f"   Naive parallel: {naive_time:.1f}s")
-                print(f"   mpmsub:         {mpmsub_time:.1f}s")
-                print(f"   Speedup:        {speedup:.2f}x")
-                print()
+    print("🔬 Running benchmarks...\n")
 
-                print(f"✅ Success Rate:")
-                print(
-                    f"   Naive parallel: {naive_result['successful_jobs']}/{num_jobs}"
-                )
-                print(
-                    f"   mpmsub:         {mpmsub_result['successful_jobs']}/{num_jobs}"
-                )
-                print(f"   Efficiency:     {efficiency:.2f}x")
-                print()
+    # Test 1: Naive parallel execution
+    print("Test 1: Naive Parallel Execution")
+    print("-" * 35)
+    try:
+        naive_result = run_naive_parallel(jobs, max_workers=4)
+    except Exception as e:
+        print(f"❌ Naive parallel failed: {e}")
+        naive_result = None
 
-                print(f"🧠 Memory Usage:")
-                print(
-                    f"   Naive parallel: {naive_result['memory_delta_mb']:.0f}MB peak"
-                )
-                print(
-                    f"   mpmsub:         {mpmsub_result['memory_delta_mb']:.0f}MB peak"
-                )
-                print()
-
-                # Conclusion
-                if speedup > 1.1 and efficiency >= 1.0:
-                    print("🎉 CONCLUSION: mpmsub provides significant benefits!")
-                    print(f"   • {speedup:.1f}x faster execution")
-                    print(f"   • {efficiency:.1f}x better success rate")
-                    print("   • Intelligent memory management prevents system overload")
-                elif efficiency > 1.1:
-                    print("🎉 CONCLUSION: mpmsub provides better reliability!")
-                    print(f"   • {efficiency:.1f}x better success rate")
-                    print("   • Prevents memory-related failures")
-                else:
-                    print("📝 CONCLUSION: Results are comparable")
-                    print("   • mpmsub provides safety without performance penalty")
-
-        else:
-            print("❌ Could not complete comparison due to errors")
-
-        print()
-        print("💡 Key Benefits of mpmsub:")
-        print("   • Prevents memory exhaustion and system crashes")
-        print("   • Optimizes job scheduling based on available resources")
-        print("   • Provides detailed performance metrics")
-        print("   • Handles mixed CPU/memory workloads intelligently")
+    print()
+
+    # Test 2: mpmsub with memory awareness
+    print("Test 2: mpmsub Memory-Aware Execution")
+    print("-" * 40)
+    try:
+        mpmsub_result = run_mpmsub(jobs, max_memory="2G", memory_per_job=memory_per_job)
+    except Exception as e:
+        print(f"❌ mpmsub failed: {e}")
+        mpmsub_result = None
+
+    print()
+
+    # Compare results
+    print("📊 COMPARISON RESULTS")
+    print("=" * 25)
+
+    if naive_result and mpmsub_result:
+        naive_time = naive_result["total_time"]
+        mpmsub_time = mpmsub_result["total_time"]
+
+        if naive_time > 0 and mpmsub_time > 0:
+            speedup = naive_time / mpmsub_time
+            efficiency = (
+                mpmsub_result["successful_jobs"] / naive_result["successful_jobs"]
+                if naive_result["successful_jobs"] > 0
+                else float("inf")
+            )
+
+            print(f"⏱️  Execution Time:")
+            print(f"   Naive parallel: {naive_time:.1f}s")
+            print(f"   mpmsub:         {mpmsub_time:.1f}s")
+            print(f"   Speedup:        {speedup:.2f}x")
+            print()
+
+            print(f"✅ Success Rate:")
+            print(f"   Naive parallel: {naive_result['successful_jobs']}/{num_jobs}")
+            print(f"   mpmsub:         {mpmsub_result['successful_jobs']}/{num_jobs}")
+            print(f"   Efficiency:     {efficiency:.2f}x")
+            print()
+
+            print(f"🧠 Memory Usage:")
+            print(
+                f"   Naive parallel: {naive_result['peak_job_mb']:.0f}MB peak per job"
+            )
+            print(
+                f"   mpmsub:         {mpmsub_result['peak_job_mb']:.0f}MB peak per job"
+            )
+            print()
+
+            # Conclusion
+            if speedup > 1.1 and efficiency >= 1.0:
+                print("🎉 CONCLUSION: mpmsub provides significant benefits!")
+                print(f"   • {speedup:.1f}x faster execution")
+                print(f"   • {efficiency:.1f}x better success rate")
+                print("   • Intelligent memory management prevents system overload")
+            elif efficiency > 1.1:
+                print("🎉 CONCLUSION: mpmsub provides better reliability!")
+                print(f"   • {efficiency:.1f}x better success rate")
+                print("   • Prevents memory-related failures")
+            else:
+                print("📝 CONCLUSION: Results are comparable")
+                print("   • mpmsub provides safety without performance penalty")
+
+    else:
+        print("❌ Could not complete comparison due to errors")
+
+    print()
+    print("💡 Key Benefits of mpmsub:")
+    print("   • Prevents memory exhaustion and system crashes")
+    print("   • Optimizes job scheduling based on available resources")
+    print("   • Provides detailed performance metrics")
+    print("   • Handles mixed CPU/memory workloads intelligently")
 
 
 if __name__ == "__main__":
@@ -7,10 +7,12 @@ Shows all the key features mentioned in your original request.
 import sys
 import os
 
-# Add parent directory to path so we can import mpmsub
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-import mpmsub
+try:
+    import mpmsub
+except ImportError:
+    # Not installed: add parent directory to path so we can import mpmsub
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import mpmsub
 
 
 def main():
@@ -36,10 +38,13 @@ def main():
         {"cmd": ["echo", "Job 5: Final task"], "p": 1, "m": "100M"},
     ]
     
+    # Collect the log lines and write them in one go
+    lines = []
     for i, job in enumerate(jobs_to_add, 1):
-        print(f"p.jobs.append({job})")
+        lines.append(f"p.jobs.append({job})")
         job_id = p.jobs.append(job)
-        print(f"✓ Added job {job_id}: {job['cmd'][0]} command, {job['p']} CPU, {job['m']} memory\n")
+        lines.append(f"✓ Added job {job_id}: {job['cmd'][0]} command, {job['p']} CPU, {job['m']} memory\n")
+    print("\n".join(lines))
     
     print(f"Total jobs queued: {len(p.jobs)}\n")
     
@@ -6,10 +6,12 @@ Basic example of using mpmsub library.
 import sys
 import os
 
-# Add parent directory to path so we can import mpmsub
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-import mpmsub
+try:
+    import mpmsub
+except ImportError:
+    # Not installed: add parent directory to path so we can import mpmsub
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import mpmsub
 from mpmsub.utils import format_memory, format_duration
 
 
@@ -43,9 +45,13 @@ def main():
     ]
 
     # Add jobs to the cluster
-    for job in jobs:
-        job_id = p.jobs.append(job)
-        print(f"Added job {job_id}: {' '.join(job['cmd'][:3])}")
+    job_ids = p.jobs.extend(jobs)
+    print(
+        "\n".join(
+            f"Added job {job_id}: {' '.join(job['cmd'][:3])}"
+            for job_id, job in zip(job_ids, jobs)
+        )
+    )
 
     print(f"\nQueued {len(p.jobs)} jobs")
 
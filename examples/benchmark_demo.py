@@ -6,31 +6,59 @@ This example shows how mpmsub's memory-aware scheduling can provide
 significant performance improvements in memory-constrained scenarios.
 """
 
+import os
 import sys
 import time
-import tempfile
 import subprocess
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
-# Add parent directory to import mpmsub
-sys.path.insert(0, str(Path(__file__).parent.parent))
-import mpmsub
+try:
+    import mpmsub
+except ImportError:
+    # Not installed: add parent directory to import mpmsub
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    import mpmsub
 
 
-def create_memory_intensive_script(memory_mb, duration_sec):
-    """Create a script that uses significant memory."""
-    return f'''
+# Progress bar redraws land inside the timed run; opt in with MPMSUB_BENCH_PROGRESS=1
+PROGRESS_BAR = os.environ.get("MPMSUB_BENCH_PROGRESS") == "1"
+
+# Job sources: the memory template is filled in with str.format()
+MEMORY_SCRIPT_TEMPLATE = '''
+import mmap
 import time
-print(f"Allocating {memory_mb}MB of memory...")
-data = bytearray({memory_mb} * 1024 * 1024)
-print(f"Working for {duration_sec} seconds...")
+print("Allocating {memory_mb}MB of memory...")
+size = {memory_mb} * 1024 * 1024
+populate = getattr(mmap, "MAP_POPULATE", 0)
+data = mmap.mmap(-1, size, flags=mmap.MAP_PRIVATE | mmap.MAP_ANONYMOUS | populate)
+if not populate:
+    data[::mmap.PAGESIZE] = b"\\x01" * len(range(0, size, mmap.PAGESIZE))
+print("Working for {duration_sec} seconds...")
 time.sleep({duration_sec})
 print("Job completed!")
 '''
 
+# Hash a 1MB block per iteration so the core is busy in C code rather than
+# in interpreter dispatch, checking the clock only once per block
+CPU_SCRIPT = '''
+import hashlib
+import time
+print("CPU-intensive computation starting...")
+block = bytes(1 << 20)
+digest = hashlib.sha256()
+deadline = time.monotonic() + 2
+while time.monotonic() < deadline:
+    digest.update(block)
+print(f"CPU job completed: {digest.hexdigest()[:16]}")
+'''
+
+
+def create_memory_intensive_script(memory_mb, duration_sec):
+    """Create a script that uses significant memory."""
+    return MEMORY_SCRIPT_TEMPLATE.format(memory_mb=memory_mb, duration_sec=duration_sec)
+
 
-def demo_memory_pressure():
+def demo_memory_pressure(cluster=None):
     """Demonstrate mpmsub benefits under memory pressure."""
     print("🎯 mpmsub Performance Demo: Memory Pressure Scenario")
     print("=" * 55)
@@ -45,103 +73,124 @@ def demo_memory_pressure():
     print(f"Total memory if run simultaneously: {num_jobs * memory_per_job / 1024:.1f}GB")
     print()
     
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
-        # Create job scripts
-        jobs = []
-        for i in range(num_jobs):
-            script_content = create_memory_intensive_script(memory_per_job, job_duration)
-            script_file = temp_path / f"job_{i}.py"
-            script_file.write_text(script_content)
-            jobs.append([sys.executable, str(script_file)])
-        
-        # Test 1: Naive approach (likely to cause memory pressure)
-        print("🔥 Test 1: Naive Parallel Execution")
-        print("-" * 35)
-        
-        def run_job(cmd):
-            try:
-                start = time.time()
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-                return time.time() - start, result.returncode == 0
-            except:
-                return 0, False
-        
-        start_time = time.time()
-        
-        # Run with limited workers to prevent complete system overload
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            results = list(executor.map(run_job, jobs))
-        
-        naive_time = time.time() - start_time
-        naive_success = sum(1 for _, success in results if success)
+    # Pass the job source with -c instead of writing script files; every
+    # job runs the same source, so build it once
+    script_content = create_memory_intensive_script(memory_per_job, job_duration)
+    jobs = [[sys.executable, '-c', script_content] for _ in range(num_jobs)]
+    
+    # Test 1: Naive approach (likely to cause memory pressure)
+    print("🔥 Test 1: Naive Parallel Execution")
+    print("-" * 35)
+    
+    def run_jobs(cmds, max_workers):
+        # One thread starts jobs and reaps whichever of its children exit
+        next_cmd = 0
+        running = {}
+        results = []
+        while next_cmd < len(cmds) or running:
+            while next_cmd < len(cmds) and len(running) < max_workers:
+                cmd = cmds[next_cmd]
+                next_cmd += 1
+                try:
+                    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL)
+                except OSError:
+                    results.append((0, False))
+                    continue
+                running[proc.pid] = (proc, time.perf_counter_ns())
+            if not running:
+                continue
+            # Poll only the children started here (os.waitid() is missing on
+            # macOS, and waiting on any child would catch ones we don't own)
+            finished = []
+            while not finished:
+                finished = [pid for pid, (proc, _) in running.items()
+                            if proc.poll() is not None]
+                if not finished:
+                    time.sleep(0.01)
+            for pid in finished:
+                proc, start = running.pop(pid)
+                results.append(((time.perf_counter_ns() - start) / 1e9,
+                                proc.returncode == 0))
+        return results
+    
+    start_ns = time.perf_counter_ns()
+    
+    # Run with limited workers to prevent complete system overload
+    results = run_jobs(jobs, max_workers=3)
+    
+    naive_time = (time.perf_counter_ns() - start_ns) / 1e9
+    naive_success = sum(1 for _, success in results if success)
+    
+    print(f"   ✅ Completed: {naive_success}/{num_jobs} jobs")
+    print(f"   ⏱️  Total time: {naive_time:.1f}s")
+    print()
+    
+    # Test 2: mpmsub approach
+    print("🚀 Test 2: mpmsub Memory-Aware Execution")
+    print("-" * 40)
+    
+    start_ns = time.perf_counter_ns()
+    
+    # Create mpmsub cluster with memory constraint, unless one is shared
+    if cluster is None:
+        cluster = mpmsub.cluster(p=6, m="3G", progress_bar=PROGRESS_BAR)  # Limit to 3GB total
+    done_before = len(cluster.completed_jobs)
+    
+    cluster.jobs.extend([
+        {
+            'cmd': cmd,
+            'p': 1,
+            'm': f'{memory_per_job + 200}M',  # Request memory + buffer
+            'id': f'memory_job_{i}'
+        }
+        for i, cmd in enumerate(jobs)
+    ])
+    
+    cluster.run()
+    
+    mpmsub_time = (time.perf_counter_ns() - start_ns) / 1e9
+    mpmsub_success = len(cluster.completed_jobs) - done_before
+    
+    print(f"   ✅ Completed: {mpmsub_success}/{num_jobs} jobs")
+    print(f"   ⏱️  Total time: {mpmsub_time:.1f}s")
+    print()
+    
+    # Compare results
+    print("📊 COMPARISON")
+    print("=" * 15)
+    
+    if naive_time > 0 and mpmsub_time > 0:
+        speedup = naive_time / mpmsub_time
+        efficiency = mpmsub_success / max(1, naive_success)
         
-        print(f"   ✅ Completed: {naive_success}/{num_jobs} jobs")
-        print(f"   ⏱️  Total time: {naive_time:.1f}s")
+        print(f"⏱️  Execution Time:")
+        print(f"   Naive:   {naive_time:.1f}s")
+        print(f"   mpmsub:  {mpmsub_time:.1f}s")
+        if speedup > 1:
+            print(f"   Result:  {speedup:.1f}x FASTER with mpmsub! 🚀")
+        else:
+            print(f"   Result:  {1/speedup:.1f}x slower (but safer)")
         print()
         
-        # Test 2: mpmsub approach
-        print("🚀 Test 2: mpmsub Memory-Aware Execution")
-        print("-" * 40)
-        
-        start_time = time.time()
-        
-        # Create mpmsub cluster with memory constraint
-        cluster = mpmsub.cluster(p=6, m="3G", progress_bar=True)  # Limit to 3GB total
-        
-        for i, cmd in enumerate(jobs):
-            cluster.jobs.append({
-                'cmd': cmd,
-                'p': 1,
-                'm': f'{memory_per_job + 200}M',  # Request memory + buffer
-                'id': f'memory_job_{i}'
-            })
-        
-        cluster.run()
-        
-        mpmsub_time = time.time() - start_time
-        mpmsub_success = len(cluster.completed_jobs)
-        
-        print(f"   ✅ Completed: {mpmsub_success}/{num_jobs} jobs")
-        print(f"   ⏱️  Total time: {mpmsub_time:.1f}s")
+        print(f"✅ Success Rate:")
+        print(f"   Naive:   {naive_success}/{num_jobs} ({naive_success/num_jobs*100:.0f}%)")
+        print(f"   mpmsub:  {mpmsub_success}/{num_jobs} ({mpmsub_success/num_jobs*100:.0f}%)")
+        if efficiency > 1:
+            print(f"   Result:  {efficiency:.1f}x BETTER reliability! ✨")
         print()
         
-        # Compare results
-        print("📊 COMPARISON")
-        print("=" * 15)
-        
-        if naive_time > 0 and mpmsub_time > 0:
-            speedup = naive_time / mpmsub_time
-            efficiency = mpmsub_success / max(1, naive_success)
-            
-            print(f"⏱️  Execution Time:")
-            print(f"   Naive:   {naive_time:.1f}s")
-            print(f"   mpmsub:  {mpmsub_time:.1f}s")
-            if speedup > 1:
-                print(f"   Result:  {speedup:.1f}x FASTER with mpmsub! 🚀")
-            else:
-                print(f"   Result:  {1/speedup:.1f}x slower (but safer)")
-            print()
-            
-            print(f"✅ Success Rate:")
-            print(f"   Naive:   {naive_success}/{num_jobs} ({naive_success/num_jobs*100:.0f}%)")
-            print(f"   mpmsub:  {mpmsub_success}/{num_jobs} ({mpmsub_success/num_jobs*100:.0f}%)")
-            if efficiency > 1:
-                print(f"   Result:  {efficiency:.1f}x BETTER reliability! ✨")
-            print()
-            
-            print("🎉 Key Benefits Demonstrated:")
-            if speedup > 1.1:
-                print(f"   • {speedup:.1f}x faster execution")
-            if efficiency > 1.0:
-                print(f"   • {efficiency:.1f}x better success rate")
-            print("   • Prevents memory exhaustion")
-            print("   • Intelligent job scheduling")
-            print("   • System stability maintained")
+        print("🎉 Key Benefits Demonstrated:")
+        if speedup > 1.1:
+            print(f"   • {speedup:.1f}x faster execution")
+        if efficiency > 1.0:
+            print(f"   • {efficiency:.1f}x better success rate")
+        print("   • Prevents memory exhaustion")
+        print("   • Intelligent job scheduling")
+        print("   • System stability maintained")
 
 
-def demo_mixed_workload():
+def demo_mixed_workload(cluster=None):
     """Demonstrate mpmsub with mixed CPU/memory workloads."""
     print("\n" + "🔀 mpmsub Performance Demo: Mixed Workload")
     print("=" * 45)
@@ -151,77 +200,52 @@ def demo_mixed_workload():
     print("This simulates real-world workloads with varying resource needs.")
     print()
     
-    with tempfile.TemporaryDirectory() as temp_dir:
-        temp_path = Path(temp_dir)
-        
-        # Create mixed jobs
-        jobs = []
-        
-        # CPU-intensive jobs (low memory, high CPU usage)
-        for i in range(3):
-            script_content = '''
-import time
-import math
-print("CPU-intensive computation starting...")
-start = time.time()
-result = 0
-while time.time() - start < 2:
-    result += math.sqrt(time.time())
-print(f"CPU job completed: {result:.2f}")
-'''
-            script_file = temp_path / f"cpu_job_{i}.py"
-            script_file.write_text(script_content)
-            jobs.append(('cpu', [sys.executable, str(script_file)]))
-        
-        # Memory-intensive jobs (high memory, low CPU usage)
-        for i in range(3):
-            script_content = create_memory_intensive_script(800, 2)
-            script_file = temp_path / f"mem_job_{i}.py"
-            script_file.write_text(script_content)
-            jobs.append(('memory', [sys.executable, str(script_file)]))
-        
-        print(f"Created {len(jobs)} mixed jobs:")
-        cpu_jobs = sum(1 for job_type, _ in jobs if job_type == 'cpu')
-        mem_jobs = sum(1 for job_type, _ in jobs if job_type == 'memory')
-        print(f"   • {cpu_jobs} CPU-intensive jobs (2 CPUs each)")
-        print(f"   • {mem_jobs} Memory-intensive jobs (800MB each)")
-        print()
-        
-        # Run with mpmsub
-        print("🚀 Running with mpmsub...")
-        
-        start_time = time.time()
-        cluster = mpmsub.cluster(p=6, m="4G", progress_bar=True)
-        
-        for job_type, cmd in jobs:
-            if job_type == 'cpu':
-                cluster.jobs.append({
-                    'cmd': cmd,
-                    'p': 2,      # CPU jobs need more cores
-                    'm': '100M', # But less memory
-                    'id': f'cpu_job'
-                })
-            else:  # memory job
-                cluster.jobs.append({
-                    'cmd': cmd,
-                    'p': 1,      # Memory jobs need fewer cores
-                    'm': '900M', # But more memory
-                    'id': f'mem_job'
-                })
-        
-        cluster.run()
-        
-        total_time = time.time() - start_time
-        
-        print(f"   ✅ Completed: {len(cluster.completed_jobs)}/{len(jobs)} jobs")
-        print(f"   ⏱️  Total time: {total_time:.1f}s")
-        print()
-        
-        print("💡 What mpmsub optimized:")
-        print("   • Scheduled CPU jobs when cores were available")
-        print("   • Scheduled memory jobs when RAM was available")
-        print("   • Prevented resource conflicts and bottlenecks")
-        print("   • Maximized overall throughput")
+    # Create mixed jobs
+    jobs = []
+    
+    # CPU-intensive jobs (low memory, high CPU usage)
+    for i in range(3):
+        jobs.append(('cpu', [sys.executable, '-c', CPU_SCRIPT]))
+    
+    # Memory-intensive jobs (high memory, low CPU usage)
+    script_content = create_memory_intensive_script(800, 2)
+    for i in range(3):
+        jobs.append(('memory', [sys.executable, '-c', script_content]))
+    
+    print(f"Created {len(jobs)} mixed jobs:")
+    cpu_jobs = sum(1 for job_type, _ in jobs if job_type == 'cpu')
+    mem_jobs = sum(1 for job_type, _ in jobs if job_type == 'memory')
+    print(f"   • {cpu_jobs} CPU-intensive jobs (2 CPUs each)")
+    print(f"   • {mem_jobs} Memory-intensive jobs (800MB each)")
+    print()
+    
+    # Run with mpmsub
+    print("🚀 Running with mpmsub...")
+    
+    start_ns = time.perf_counter_ns()
+    if cluster is None:
+        cluster = mpmsub.cluster(p=6, m="4G", progress_bar=PROGRESS_BAR)
+    done_before = len(cluster.completed_jobs)
+    
+    resources = {
+        'cpu': {'p': 2, 'm': '100M', 'id': 'cpu_job'},     # More cores, less memory
+        'memory': {'p': 1, 'm': '900M', 'id': 'mem_job'},  # Fewer cores, more memory
+    }
+    cluster.jobs.extend([{'cmd': cmd, **resources[job_type]} for job_type, cmd in jobs])
+    
+    cluster.run()
+    
+    total_time = (time.perf_counter_ns() - start_ns) / 1e9
+    
+    print(f"   ✅ Completed: {len(cluster.completed_jobs) - done_before}/{len(jobs)} jobs")
+    print(f"   ⏱️  Total time: {total_time:.1f}s")
+    print()
+    
+    print("💡 What mpmsub optimized:")
+    print("   • Scheduled CPU jobs when cores were available")
+    print("   • Scheduled memory jobs when RAM was available")
+    print("   • Prevented resource conflicts and bottlenecks")
+    print("   • Maximized overall throughput")
 
 
 def main():
@@ -232,11 +256,15 @@ def main():
     print("memory-aware scheduling in practical scenarios.\n")
     
     try:
+        # Both demos queue onto one cluster; a 3GB limit keeps the memory
+        # pressure scenario constrained and still fits the mixed workload
+        cluster = mpmsub.cluster(p=6, m="3G", progress_bar=PROGRESS_BAR)
+        
         # Demo 1: Memory pressure
-        demo_memory_pressure()
+        demo_memory_pressure(cluster)
         
         # Demo 2: Mixed workloads
-        demo_mixed_workload()
+        demo_mixed_workload(cluster)
         
         print("\n" + "🎉 Demonstrations Complete!")
         print("=" * 30)
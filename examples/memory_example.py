@@ -37,11 +37,11 @@ def main():
         {"cmd": ["python3", "-c", "import time; print('Medium job 2'); time.sleep(1)"], 
          "p": 1, "m": "200M", "id": "medium_2"},
         
-        # Large memory job that should wait for others to complete
+        # Largest job: started first, smaller jobs fill in around it
         {"cmd": ["python3", "-c", "import time; print('Large job - needs lots of memory'); time.sleep(1.5)"], 
          "p": 1, "m": "600M", "id": "large_1"},
         
-        # Another large job
+        # Another large job: it can't fit beside the first, so it waits
         {"cmd": ["python3", "-c", "import time; print('Large job 2'); time.sleep(1)"], 
          "p": 1, "m": "500M", "id": "large_2"},
     ]
@@ -53,7 +53,7 @@ def main():
     
     print(f"\nQueued {len(p.jobs)} jobs")
     print("Note: Jobs will be scheduled based on available memory")
-    print("Large jobs may wait for smaller ones to complete\n")
+    print("The largest jobs start first; smaller ones fill in the memory left over\n")
     
     # Run all jobs
     print("Starting execution...")
@@ -69,12 +69,13 @@ def main():
     # Sort jobs by start time to show execution order
     completed_jobs = sorted(p.completed_jobs, key=lambda x: x.start_time)
     
+    first_start = completed_jobs[0].start_time if completed_jobs else 0
     for i, job in enumerate(completed_jobs):
-        print(f"{i+1}. {job.job_id}: started at {job.start_time:.1f}s, "
+        print(f"{i+1}. {job.job_id}: started at {job.start_time - first_start:.1f}s, "
               f"ran for {format_duration(job.runtime)}")
     
     print(f"\nTotal execution time: {format_duration(results['cluster']['runtime'])}")
-    print("Notice how large memory jobs were delayed until sufficient memory was available!")
+    print("Notice how large_1 started first, and large_2 waited until it had enough memory!")
 
 
 if __name__ == "__main__":
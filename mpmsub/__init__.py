@@ -24,21 +24,30 @@ Example usage:
         print(f"Memory used: {job['memory_used']:.1f}MB")
 """
 
-import importlib.metadata
-from typing import Any, List, Optional, Union
+from typing import Any, Callable, List, Optional, Union
 
 from .cluster import Cluster, Job, Pipeline
 from .utils import format_memory, parse_cpu_string, parse_memory_string
 
-try:
-    __version__ = importlib.metadata.version("mpmsub")
-except importlib.metadata.PackageNotFoundError:
-    __version__ = "25.9.16"  # Default version if package is not installed
-
 __author__ = "Jon Palmer"
 __email__ = "nextgenusfs@gmail.com"
 
 
+def __getattr__(name: str) -> Any:
+    # Looking up the installed version loads importlib.metadata, which costs
+    # more than importing the rest of the package, so defer it until asked
+    if name == "__version__":
+        import importlib.metadata
+
+        try:
+            version = importlib.metadata.version("mpmsub")
+        except importlib.metadata.PackageNotFoundError:
+            version = "25.9.16"  # Default version if package is not installed
+        globals()["__version__"] = version
+        return version
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # Main API function
 def cluster(
     p=None,
@@ -49,6 +58,10 @@ def cluster(
     verbose=True,
     progress_bar=True,
     describe=False,
+    batch_size=1,
+    monitor_memory=True,
+    pin_cpus=False,
+    keep_results=None,
 ):
     """
     Create a new compute cluster for job execution.
@@ -65,6 +78,16 @@ def cluster(
         verbose: Whether to print progress information.
         progress_bar: Whether to show a progress bar during execution.
         describe: Whether to print cluster resource information.
+        batch_size: Maximum number of short jobs to run back to back in one
+                    shell process (POSIX only). Default 1 disables batching.
+        monitor_memory: Whether to sample each job's memory while it runs.
+                        Turn off when every job's 'm' is already known to skip
+                        the sampling overhead; memory_used is then 0.0.
+        pin_cpus: Whether to pin each job to its own CPU cores (Linux only),
+                  keeping CPU-bound jobs from migrating between cores.
+        keep_results: Keep only this many of the most recent completed and
+                      failed results, bounding memory on very long runs.
+                      Default None keeps them all.
 
     Returns:
         Cluster: A new cluster instance ready for job scheduling.
@@ -84,7 +107,14 @@ def cluster(
     memory_param = m or memory
 
     cluster_obj = Cluster(
-        cpus=cpu_param, memory=memory_param, verbose=verbose, progress_bar=progress_bar
+        cpus=cpu_param,
+        memory=memory_param,
+        verbose=verbose,
+        progress_bar=progress_bar,
+        batch_size=batch_size,
+        monitor_memory=monitor_memory,
+        pin_cpus=pin_cpus,
+        keep_results=keep_results,
     )
 
     if describe:
@@ -94,7 +124,7 @@ def cluster(
 
 
 def job(
-    cmd: List[str],
+    cmd: Union[List[str], Callable[[], Any]],
     p: Optional[Union[int, str]] = None,
     m: Optional[Union[str, int]] = None,
     cpu: Optional[Union[int, str]] = None,
@@ -106,13 +136,15 @@ def job(
     Create a new Job object with a concise interface.
 
     Args:
-        cmd: Command to execute as list of strings
+        cmd: Command to execute as list of strings, or a Python callable to
+             run in-process
         p: Number of CPU cores needed (default: 1)
         m: Memory requirement (e.g., "1G", "512M", default: unlimited)
         cpu: Alternative to 'p' - Number of CPU cores needed
         cpus: Alternative to 'p' - Number of CPU cores needed
         memory: Alternative to 'm' - Memory requirement
-        **kwargs: Additional job parameters (id, cwd, env, timeout, stdout, stderr)
+        **kwargs: Additional job parameters (id, cwd, env, timeout, stdout, stderr,
+                  capture_output)
 
     Returns:
         Job: A new job instance.
@@ -151,7 +183,8 @@ def pipeline(
         cpu: Alternative to 'p' - Number of CPU cores needed
         cpus: Alternative to 'p' - Number of CPU cores needed
         memory: Alternative to 'm' - Memory requirement
-        **kwargs: Additional job parameters (id, cwd, env, timeout, stdout, stderr)
+        **kwargs: Additional job parameters (id, cwd, env, timeout, stdout, stderr,
+                  capture_output)
 
     Returns:
         Job: A new job instance with a pipeline.
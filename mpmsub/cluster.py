@@ -2,18 +2,27 @@
 Core Cluster class for mpmsub library.
 """
 
+import bisect
+import contextlib
+import functools
 import logging
+import logging.handlers
 import os
+import queue
+import re
+import shlex
+import shutil
 import subprocess
 import sys
 import threading
 import time
-from collections import defaultdict
+import uuid
+from collections import defaultdict, deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Union
-
-import psutil
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
 
 from .utils import (
     format_duration,
@@ -28,17 +37,31 @@ from .utils import (
 class ProgressBar:
     """Simple progress bar using only standard library."""
 
-    def __init__(self, total: int, width: int = 40, show_percent: bool = True):
+    def __init__(
+        self,
+        total: int,
+        width: int = 40,
+        show_percent: bool = True,
+        min_interval: float = 0.1,
+    ):
         self.total = total
         self.current = 0
         self.width = width
         self.show_percent = show_percent
-        self.start_time = time.time()
+        self.min_interval = min_interval  # seconds between redraws
+        self.start_time = time.monotonic()
+        self._last_draw = float("-inf")
 
     def update(self, increment: int = 1):
         """Update progress by increment."""
         self.current = min(self.current + increment, self.total)
-        self._draw()
+
+        # Many short jobs can finish in a burst; redraw at most every
+        # min_interval seconds, but always show the final state
+        now = time.monotonic()
+        if self.current >= self.total or now - self._last_draw >= self.min_interval:
+            self._last_draw = now
+            self._draw()
 
     def _draw(self):
         """Draw the progress bar."""
@@ -53,7 +76,7 @@ class ProgressBar:
         bar = "█" * filled_width + "░" * (self.width - filled_width)
 
         # Calculate stats
-        elapsed = time.time() - self.start_time
+        elapsed = time.monotonic() - self.start_time
 
         # Build progress line
         line = f"\r[{bar}] {self.current}/{self.total}"
@@ -67,37 +90,46 @@ class ProgressBar:
                 eta = (self.total - self.current) / rate
                 line += f" ETA: {format_duration(eta)}"
 
+        # Add newline when complete
+        if self.current >= self.total:
+            line += "\n"
+
         # Write to stderr to avoid interfering with stdout
         sys.stderr.write(line)
         sys.stderr.flush()
 
-        # Add newline when complete
-        if self.current >= self.total:
-            sys.stderr.write("\n")
-            sys.stderr.flush()
-
     def finish(self):
         """Ensure progress bar shows 100% completion."""
         self.current = self.total
         self._draw()
 
 
-@dataclass
+# Slotted dataclasses (Python 3.10+) drop the per-instance __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
 class JobResult:
     """Result of a completed job."""
 
     job_id: str
-    cmd: Union[List[str], "Pipeline"]
+    cmd: Union[List[str], "Pipeline", Callable[[], Any]]
     returncode: int = 0
     stdout: str = ""
     stderr: str = ""
-    runtime: float = 0.0
+    runtime_ns: int = 0  # Monotonic wall time, in nanoseconds
     memory_used: float = 0.0  # Peak memory in MB
     cpu_used: int = 1
     start_time: float = 0.0
     end_time: float = 0.0
     success: bool = False
     error: Optional[str] = None
+    value: Any = None  # Return value of a Python callable job
+
+    @property
+    def runtime(self) -> float:
+        """Runtime in seconds."""
+        return self.runtime_ns / 1e9
 
 
 @dataclass
@@ -157,6 +189,21 @@ class Job:
     Supports both single commands and pipelines.
     """
 
+    # Fixed attribute slots instead of a per-instance __dict__ keep large
+    # job lists small
+    __slots__ = (
+        "cmd",
+        "p",
+        "m",
+        "id",
+        "cwd",
+        "env",
+        "timeout",
+        "stdout",
+        "stderr",
+        "capture_output",
+    )
+
     def __init__(
         self,
         cmd: Union[List[str], Pipeline, None] = None,
@@ -169,12 +216,15 @@ class Job:
         pipeline: Optional[List[List[str]]] = None,
         stdout: Optional[str] = None,
         stderr: Optional[str] = None,
+        capture_output: bool = True,
+        func: Optional[Callable[[], Any]] = None,
     ):
         """
         Create a new job.
 
         Args:
-            cmd: Command to execute as list of strings, or Pipeline object
+            cmd: Command to execute as list of strings, Pipeline object, or a
+                 Python callable taking no arguments
             p: Number of CPU cores needed (default: 1)
             m: Memory requirement (e.g., "1G", "512M", default: unlimited)
             id: Custom job identifier (auto-generated if None)
@@ -184,16 +234,25 @@ class Job:
             pipeline: Alternative way to specify pipeline as list of commands
             stdout: File path to redirect stdout to (optional)
             stderr: File path to redirect stderr to (optional)
+            capture_output: Keep stdout/stderr in the job result (default: True).
+                            When False, output not redirected to a file is
+                            discarded instead of held in memory.
+            func: Alternative way to specify a Python callable. It runs in
+                  the worker thread instead of a subprocess; its return value
+                  is kept in the result's value, and timeout, cwd, env and
+                  output options do not apply.
         """
-        # Handle pipeline specification
+        # Handle pipeline or callable specification
         if pipeline is not None:
             self.cmd = Pipeline(pipeline)
+        elif func is not None:
+            self.cmd = func
         elif isinstance(cmd, Pipeline):
             self.cmd = cmd
         elif cmd is not None:
             self.cmd = cmd
         else:
-            raise ValueError("Must specify either 'cmd' or 'pipeline'")
+            raise ValueError("Must specify 'cmd', 'pipeline' or 'func'")
 
         self.p = p
         self.m = m
@@ -203,6 +262,7 @@ class Job:
         self.timeout = timeout
         self.stdout = stdout
         self.stderr = stderr
+        self.capture_output = capture_output
 
     def cpu(self, cores: Union[int, str]) -> "Job":
         """Set CPU requirement (builder pattern)."""
@@ -256,6 +316,12 @@ class Job:
             raise ValueError("Cannot pipe from non-command job")
         return self
 
+    def __getitem__(self, key: str) -> Any:
+        """Dictionary-style access to job fields, e.g. job["cmd"]."""
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary format for internal use."""
         return {
@@ -268,12 +334,15 @@ class Job:
             "timeout": self.timeout,
             "stdout": self.stdout,
             "stderr": self.stderr,
+            "capture_output": self.capture_output,
         }
 
     def __repr__(self) -> str:
         """String representation of the job."""
         if isinstance(self.cmd, Pipeline):
             return f"Job(pipeline={self.cmd}, p={self.p}, m={self.m})"
+        elif callable(self.cmd):
+            return f"Job(func={_describe_cmd(self.cmd)}, p={self.p}, m={self.m})"
         else:
             cmd_str = " ".join(self.cmd[:3])
             if len(self.cmd) > 3:
@@ -281,47 +350,168 @@ class Job:
             return f"Job(cmd=[{cmd_str}], p={self.p}, m={self.m})"
 
 
+# Finished results: a list, or a bounded deque when keep_results is set
+_Results = Union[List[JobResult], Deque[JobResult]]
+
+
 class JobQueue:
-    """Manage job queue with priority scheduling."""
+    """Manage job queue with priority scheduling.
 
-    def __init__(self):
-        self.pending_jobs = []
+    Pending jobs are grouped by shape (memory, CPUs), and shapes are kept
+    sorted so the largest jobs (by memory, then CPUs) are offered resources
+    first, while small jobs fill in around them; jobs of the same shape run in
+    submission order. Real workloads have only a few distinct shapes, so
+    finding the next job that fits looks at shapes rather than every job.
+
+    Finished results are kept in lists; with keep_results set, they go in
+    bounded deques holding only the most recent keep_results of each kind,
+    while counts and totals still cover every job.
+    """
+
+    def __init__(self, keep_results: Optional[int] = None):
+        self._by_shape = {}  # (memory, CPUs) -> deque of (submission order, job)
+        self._shapes = []  # sorted keys of _by_shape; the last is offered first
+        self._pending_count = 0
         self.running_jobs = {}
-        self.completed_jobs = []
-        self.failed_jobs = []
+        # Plain lists unless bounded, so existing code can still slice them
+        self.completed_jobs: _Results = (
+            [] if keep_results is None else deque(maxlen=keep_results)
+        )
+        self.failed_jobs: _Results = (
+            [] if keep_results is None else deque(maxlen=keep_results)
+        )
+        self._completed_count = 0
+        self._failed_count = 0
+        # Running totals over every completed job, for the summary
+        self._runtime_total = 0.0
+        self._memory_total = 0.0
+        self._memory_peak = 0.0
         self._job_counter = 0
+        self._submitted = 0
+        # One shared copy of each distinct environment of the queued jobs;
+        # emptied whenever the queue drains so per-job envs don't pile up
+        self._envs = {}
         self._lock = threading.Lock()
 
     def add_job(self, job: Dict[str, Any]) -> str:
         """Add a job to the queue."""
+        # Validate and normalize job; it touches no queue state, so keep it
+        # outside the lock
+        normalized_job = validate_job(job)
+
         with self._lock:
-            # Validate and normalize job
-            normalized_job = validate_job(job)
+            # Jobs usually repeat a handful of environments; keep one dict each
+            env = normalized_job["env"]
+            if env:
+                try:
+                    key = frozenset(env.items())
+                except TypeError:
+                    pass  # unhashable values; keep the job's own dict
+                else:
+                    normalized_job["env"] = self._envs.setdefault(key, dict(env))
 
             # Assign unique ID if not provided
             if normalized_job["id"] is None:
                 self._job_counter += 1
                 normalized_job["id"] = f"job_{self._job_counter:04d}"
 
-            self.pending_jobs.append(normalized_job)
+            # No memory limit sorts as 0
+            shape = (normalized_job["m"] or 0, normalized_job["p"])
+            pending = self._by_shape.get(shape)
+            if pending is None:
+                pending = self._by_shape[shape] = deque()
+                bisect.insort(self._shapes, shape)
+            pending.append((self._submitted, normalized_job))
+            self._submitted += 1
+            self._pending_count += 1
             return normalized_job["id"]
 
+    def _drop_shape(self, index: int):
+        """Forget an emptied shape. Callers hold the lock."""
+        del self._by_shape[self._shapes.pop(index)]
+
+    @property
+    def pending_jobs(self) -> List[Dict[str, Any]]:
+        """Pending jobs in submission order."""
+        with self._lock:
+            entries = [
+                entry for pending in self._by_shape.values() for entry in pending
+            ]
+            return [job for _, job in sorted(entries, key=itemgetter(0))]
+
     def get_next_job(
         self, available_cpus: int, available_memory: float
     ) -> Optional[Dict]:
-        """Get the next job that can run with available resources."""
+        """Get the highest-priority job that can run with available resources."""
+        jobs = self.get_next_jobs(available_cpus, available_memory, 1)
+        return jobs[0] if jobs else None
+
+    def get_next_jobs(
+        self, available_cpus: int, available_memory: float, max_count: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Take up to max_count jobs that fit in the available resources together.
+
+        Jobs are chosen in priority order, exactly as repeated get_next_job()
+        calls would, but in a single pass under one lock acquisition.
+        """
         with self._lock:
-            for i, job in enumerate(self.pending_jobs):
-                # Check CPU constraint
-                if job["p"] > available_cpus:
-                    continue
+            taken = []
+            # Every shape before this index fits in memory; walk down from the
+            # largest, charging each job taken against the budget
+            end = bisect.bisect_right(
+                self._shapes, (max(available_memory, 0), float("inf"))
+            )
+            for i in range(end - 1, -1, -1):
+                memory, cpus = shape = self._shapes[i]
+                pending = self._by_shape[shape]
+                while (
+                    pending
+                    and len(taken) < max_count
+                    and cpus <= available_cpus
+                    and (memory == 0 or memory <= available_memory)
+                ):
+                    taken.append(pending.popleft()[1])
+                    available_cpus -= cpus
+                    available_memory -= memory
+                if not pending:
+                    self._drop_shape(i)
+                if len(taken) >= max_count or available_cpus < 1:
+                    break
+            self._pending_count -= len(taken)
+            return taken
 
-                # Check memory constraint (None means no limit)
-                if job["m"] is not None and job["m"] > available_memory:
-                    continue
+    def take_matching(
+        self, predicate, limit: int, cpus: int, max_memory: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Pop up to limit pending jobs that satisfy predicate, in priority order.
 
-                return self.pending_jobs.pop(i)
-            return None
+        Only shapes needing exactly cpus CPUs and at most max_memory MB are
+        looked at, so other jobs are never touched.
+        """
+        with self._lock:
+            taken = []
+            end = bisect.bisect_right(self._shapes, (max(max_memory, 0), float("inf")))
+            for i in range(end - 1, -1, -1):
+                if len(taken) >= limit:
+                    break
+                shape = self._shapes[i]
+                if shape[1] != cpus:
+                    continue
+                pending = self._by_shape[shape]
+                skipped = []
+                while pending and len(taken) < limit:
+                    entry = pending.popleft()
+                    if predicate(entry[1]):
+                        taken.append(entry[1])
+                    else:
+                        skipped.append(entry)
+                pending.extendleft(reversed(skipped))
+                if not pending:
+                    self._drop_shape(i)
+            self._pending_count -= len(taken)
+            return taken
 
     def mark_running(self, job: Dict[str, Any]):
         """Mark a job as running."""
@@ -337,78 +527,512 @@ class JobQueue:
 
             if result.success:
                 self.completed_jobs.append(result)
+                self._completed_count += 1
+                self._runtime_total += result.runtime
+                self._memory_total += result.memory_used
+                self._memory_peak = max(self._memory_peak, result.memory_used)
             else:
                 self.failed_jobs.append(result)
+                self._failed_count += 1
+
+            if not self._pending_count and not self.running_jobs:
+                self._envs.clear()
 
     def get_stats(self) -> Dict[str, int]:
         """Get queue statistics."""
         with self._lock:
             return {
-                "pending": len(self.pending_jobs),
+                "pending": self._pending_count,
                 "running": len(self.running_jobs),
-                "completed": len(self.completed_jobs),
-                "failed": len(self.failed_jobs),
-                "total": len(self.pending_jobs)
+                "completed": self._completed_count,
+                "failed": self._failed_count,
+                "total": self._pending_count
                 + len(self.running_jobs)
-                + len(self.completed_jobs)
-                + len(self.failed_jobs),
+                + self._completed_count
+                + self._failed_count,
             }
 
+    def get_totals(self) -> Dict[str, float]:
+        """Get runtime and memory totals over all completed jobs."""
+        with self._lock:
+            return {
+                "runtime": self._runtime_total,
+                "memory": self._memory_total,
+                "peak_memory": self._memory_peak,
+            }
+
+
+# Size of a memory page in MB, for converting /proc/<pid>/statm page counts
+_PAGE_MB = (os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096) / (
+    1024 * 1024
+)
+
+
+# Linux lists each task's direct children in /proc when built with
+# CONFIG_PROC_CHILDREN
+_PROC_CHILDREN = os.path.exists(f"/proc/{os.getpid()}/task/{os.getpid()}/children")
+
+
+def _descendant_pids(pid: int) -> Optional[List[int]]:
+    """
+    PIDs of every descendant of pid, read from /proc/<pid>/task/*/children.
+
+    This only visits the job's own process tree, unlike psutil's children(),
+    which scans every process on the system. Returns None where those files
+    are unavailable (non-Linux, or kernels without CONFIG_PROC_CHILDREN).
+    """
+    if not _PROC_CHILDREN:
+        return None
+    pids = []
+    stack = [pid]
+    while stack:
+        parent = stack.pop()
+        try:
+            tids = os.listdir(f"/proc/{parent}/task")
+        except OSError:
+            continue  # exited since its parent listed it
+        for tid in tids:
+            try:
+                with open(f"/proc/{parent}/task/{tid}/children") as f:
+                    children = [int(child) for child in f.read().split()]
+            except OSError:
+                continue
+            pids.extend(children)
+            stack.extend(children)
+    return pids
+
+
+def _open_statm(pid: int) -> Optional[int]:
+    """Open /proc/<pid>/statm for repeated reads, or return None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return os.open(f"/proc/{pid}/statm", os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def _statm_rss_mb(fd: int) -> float:
+    """Resident set size in MB from an open statm descriptor."""
+    return int(os.pread(fd, 64, 0).split()[1]) * _PAGE_MB
+
+
+@functools.lru_cache(maxsize=256)
+def _which(name: str, path: str) -> Optional[str]:
+    """Cached PATH lookup; the same few programs are launched over and over."""
+    return shutil.which(name, path=path)
+
+
+def _resolve_executable(cmd: List[str], env: Optional[Dict[str, str]]) -> Optional[str]:
+    """
+    Absolute path of a bare program name in cmd[0], or None to let Popen search.
+
+    Popen only takes its posix_spawn() fast path (no fork of the parent's
+    page tables) when the executable has a directory component, so bare names
+    like "sleep" are resolved here against the PATH the child will see.
+    """
+    name = cmd[0]
+    if os.name != "posix" or not isinstance(name, str) or os.sep in name:
+        return None
+    path = (os.environ if env is None else env).get("PATH", os.defpath)
+    return _which(name, path)
+
+
+def _output_dest(job: Dict[str, Any]) -> int:
+    """Where a job's output goes when it is not redirected to a file."""
+    # Uncaptured output goes straight to /dev/null instead of being read,
+    # decoded and held in memory until the job finishes
+    return subprocess.PIPE if job.get("capture_output", True) else subprocess.DEVNULL
+
+
+def _close_redirects(*dests) -> None:
+    """Close any files opened to redirect a job's output."""
+    for dest in dests:
+        if dest not in (subprocess.PIPE, subprocess.DEVNULL):
+            dest.close()
+
+
+def _pin(process: subprocess.Popen, cores: Optional[List[int]]) -> None:
+    """Restrict a just-started child to the given CPU cores, if any."""
+    # Set from the parent rather than a preexec_fn, which is unsafe with
+    # threads and would rule out posix_spawn; threads and children the job
+    # starts from here on inherit the mask
+    if cores:
+        try:
+            os.sched_setaffinity(process.pid, cores)
+        except OSError:
+            pass  # already exited; nothing left to pin
+
+
+def _batch_program(cmd: List[str]) -> Optional[str]:
+    """
+    Absolute path of the program cmd runs, or None if it is not a file.
+
+    A batch shell would run its own builtins (echo, kill, cd, exit, ...) in
+    place of programs of the same name, and report a missing program as exit
+    status 127, so batched commands name their program by absolute path.
+    """
+    name = cmd[0]
+    if os.path.isabs(name):
+        path = _which(name, "")
+    else:
+        path = _resolve_executable(cmd, None)
+    return path if path and os.path.isabs(path) else None
+
+
+def _is_batchable(job: Dict[str, Any]) -> bool:
+    """Whether a job is a plain single-CPU command that can share a shell."""
+    return (
+        os.name == "posix"
+        and job["p"] == 1
+        and isinstance(job["cmd"], list)
+        and not any(
+            job.get(key) for key in ("cwd", "env", "timeout", "stdout", "stderr")
+        )
+        # shlex.join() takes only str; Path and bytes arguments run alone
+        and all(isinstance(arg, str) for arg in job["cmd"])
+        # Missing programs and relative paths run alone, and fail or run as
+        # they would outside a batch
+        and _batch_program(job["cmd"]) is not None
+    )
+
+
+def _failed_results(jobs: List[Dict[str, Any]], error: str) -> List[JobResult]:
+    """Failed results for jobs that never got to run."""
+    return [
+        JobResult(job_id=job["id"], cmd=job["cmd"], returncode=-1, error=error)
+        for job in jobs
+    ]
+
+
+# ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+_MAXRSS_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+class _RusagePopen(subprocess.Popen):
+    """
+    Popen that keeps the child's resource usage from when it was reaped.
+
+    wait4() hands back the kernel's peak RSS for the child at no extra cost,
+    which catches short spikes that periodic sampling can miss. Only the
+    blocking wait() path goes through here; poll() reaps with plain
+    waitpid(), so rusage stays None if the child was collected that way.
+    """
+
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        if not hasattr(os, "wait4"):
+            return super()._try_wait(wait_flags)
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Same fallback as Popen: the child is gone and its status lost
+            return (self.pid, 0)
+        if pid:
+            self.rusage = rusage
+        return (pid, sts)
+
+
+def _has_exited(process: subprocess.Popen) -> bool:
+    """Whether process has exited, without reaping it where possible."""
+    if process.returncode is not None:
+        return True
+    if hasattr(os, "waitid"):
+        # WNOWAIT leaves the child for Popen to reap (and record rusage)
+        try:
+            flags = os.WEXITED | os.WNOHANG | os.WNOWAIT
+            return os.waitid(os.P_PID, process.pid, flags) is not None
+        except ChildProcessError:
+            return True
+    return process.poll() is not None
+
+
+def _peak_rss_mb(processes: List[subprocess.Popen]) -> float:
+    """Kernel-reported peak RSS of reaped processes in MB, summed over stages."""
+    return sum(
+        process.rusage.ru_maxrss * _MAXRSS_MB
+        for process in processes
+        if getattr(process, "rusage", None) is not None
+    )
+
+
+class _ProcessWatch:
+    """Sampling state for one monitored job's process tree."""
+
+    __slots__ = (
+        "process",
+        "statm_fd",
+        "psutil_process",
+        "child_fds",
+        "interval",
+        "next_sample",
+        "last_memory",
+    )
+
+    def __init__(self, process: subprocess.Popen, interval: float):
+        self.process = process
+        self.interval = interval  # seconds until the next sample
+        self.next_sample = 0.0  # monotonic time; sample straight away
+        self.last_memory = None
+        # On Linux the job's own RSS comes from one pread() of a statm fd
+        # kept open for the whole job, rather than a psutil call per sample
+        self.statm_fd = _open_statm(process.pid)
+        self.psutil_process = None
+        self.child_fds = {}  # pid -> statm fd, when /proc lists children
+
+    def sample(self) -> Optional[float]:
+        """Current memory of the process and its children in MB, or None once
+        the process has exited or can no longer be read."""
+        # psutil is only needed once jobs run, so keep it out of import time
+        import psutil
+
+        if _has_exited(self.process):
+            return None
+
+        try:
+            if self.statm_fd is not None:
+                current_memory = _statm_rss_mb(self.statm_fd)
+            else:
+                memory_info = self._psutil_process().memory_info()
+                current_memory = memory_info.rss / (1024 * 1024)  # Convert to MB
+
+            # Include children
+            child_pids = _descendant_pids(self.process.pid)
+            if child_pids is None:
+                for child in self._psutil_process().children(recursive=True):
+                    try:
+                        child_memory = child.memory_info()
+                        current_memory += child_memory.rss / (1024 * 1024)
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        pass
+            else:
+                # Children get a statm fd of their own, like the job itself;
+                # fds of children no longer listed are closed
+                known = self.child_fds
+                self.child_fds = {}
+                for pid in child_pids:
+                    fd = known.pop(pid, None)
+                    if fd is None:
+                        fd = _open_statm(pid)
+                        if fd is None:
+                            continue  # exited since it was listed
+                    self.child_fds[pid] = fd
+                for fd in known.values():
+                    os.close(fd)
+                for fd in self.child_fds.values():
+                    try:
+                        current_memory += _statm_rss_mb(fd)
+                    except OSError:
+                        pass  # exited since it was listed
+
+        except (psutil.NoSuchProcess, psutil.AccessDenied, OSError):
+            return None
+
+        return current_memory
+
+    def reschedule(
+        self, memory: float, now: float, min_interval: float, max_interval: float
+    ):
+        """Set the next sample time, backing off while memory holds steady."""
+        last = self.last_memory
+        if last is not None and abs(memory - last) <= 0.02 * max(last, 1.0):
+            self.interval = min(self.interval * 1.5, max_interval)
+        else:
+            self.interval = max(self.interval * 0.5, min_interval)
+        self.last_memory = memory
+        self.next_sample = now + self.interval
+
+    def _psutil_process(self):
+        """psutil handle on the job's process, made on first use."""
+        # psutil is only needed once jobs run, so keep it out of import time
+        import psutil
+
+        if self.psutil_process is None:
+            self.psutil_process = psutil.Process(self.process.pid)
+        return self.psutil_process
+
+    def close(self):
+        """Release the statm descriptors."""
+        if self.statm_fd is not None:
+            os.close(self.statm_fd)
+            self.statm_fd = None
+        for fd in self.child_fds.values():
+            os.close(fd)
+        self.child_fds = {}
+
+
+class _Deferred:
+    """Log argument that is only rendered when the record is formatted."""
+
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return self.func(*self.args)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler merges the message and its arguments before queueing;
+    records here are consumed in-process and their arguments are not
+    modified afterwards, so they can be queued as they are.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _QueuedLogging:
+    """A logger's swapped-out handlers and the listener now feeding them."""
+
+    __slots__ = ("runs", "handlers", "queue_handler", "listener")
+
+    def __init__(self, logger: logging.Logger):
+        log_queue = queue.SimpleQueue()
+        self.runs = 0
+        self.handlers = logger.handlers[:]
+        self.queue_handler = _DeferredQueueHandler(log_queue)
+        self.listener = logging.handlers.QueueListener(
+            log_queue, *self.handlers, respect_handler_level=True
+        )
+
+
+_queued_lock = threading.Lock()
+_queued = {}  # logger -> _QueuedLogging, while any run is using it
+
+
+@contextlib.contextmanager
+def _queued_logging(logger: logging.Logger):
+    """
+    Put logger's handlers behind one QueueListener while any run uses it.
+
+    Loggers are process-wide, so runs of different clusters can overlap: the
+    first run to start installs the queue handler and listener, and the last
+    to finish stops the listener and restores the original handlers, unless
+    the logger's handlers were changed in the meantime.
+    """
+    with _queued_lock:
+        state = _queued.get(logger)
+        if state is None and logger.handlers:
+            state = _queued[logger] = _QueuedLogging(logger)
+            logger.handlers = [state.queue_handler]
+            state.listener.start()
+        if state is not None:
+            state.runs += 1
+    try:
+        yield
+    finally:
+        if state is not None:
+            with _queued_lock:
+                state.runs -= 1
+                if not state.runs:
+                    del _queued[logger]
+                    if logger.handlers == [state.queue_handler]:
+                        logger.handlers = state.handlers
+                    else:
+                        # Replaced during the run; just drop our handler
+                        logger.removeHandler(state.queue_handler)
+                    state.listener.stop()
+
+
+def _describe_cmd(cmd: Union[List[str], Pipeline, Callable[[], Any]]) -> str:
+    """Short description of a command, pipeline or callable for log lines."""
+    if isinstance(cmd, Pipeline):
+        return f"Pipeline: {' | '.join([' '.join(c[:2]) for c in cmd.commands[:2]])}..."
+    if callable(cmd):
+        return f"{getattr(cmd, '__qualname__', repr(cmd))}()"
+    return " ".join(cmd[:3]) + ("..." if len(cmd) > 3 else "")
+
+
+def _worker(work_queue: queue.SimpleQueue, done_queue: queue.SimpleQueue):
+    """Run (ticket, function, *args) tasks until a None sentinel arrives."""
+    while True:
+        task = work_queue.get()
+        if task is None:
+            return
+        ticket, func, *args = task
+        try:
+            outcome = func(*args)
+        except BaseException as e:
+            # Includes SystemExit from a callable job: the thread must still
+            # report back, or the scheduler waits on done_queue forever
+            outcome = e  # handled by the scheduler, like Future.result()
+        done_queue.put((ticket, outcome))
+
 
 class MemoryMonitor:
-    """Monitor memory usage of running processes."""
+    """Monitor memory usage of running processes.
+
+    A single sampler thread serves every running job, and exits once no job
+    is left to watch. Each job is sampled straight away, then every
+    sampling_interval seconds; while its memory holds steady the interval
+    backs off towards max_interval, and it drops back as soon as usage moves.
+    """
 
-    def __init__(self, sampling_interval: float = 0.5):
+    def __init__(self, sampling_interval: float = 0.05, max_interval: float = 2.0):
         self.sampling_interval = sampling_interval
+        self.max_interval = max_interval
         self._monitoring = {}
+        self._watches = {}  # job_id -> _ProcessWatch for jobs still running
         self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._sampler = None
 
-    def start_monitoring(
-        self, job_id: str, process: subprocess.Popen
-    ) -> threading.Thread:
+    def start_monitoring(self, job_id: str, process: subprocess.Popen) -> None:
         """Start monitoring a process."""
+        watch = _ProcessWatch(process, self.sampling_interval)
+        with self._lock:
+            self._watches[job_id] = watch
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+                self._sampler.start()
+            else:
+                self._wakeup.notify()
 
-        def monitor():
-            try:
-                psutil_process = psutil.Process(process.pid)
-                peak_memory = 0.0
-
-                while process.poll() is None:
+    def _sample_loop(self):
+        """Sample every watched job as it falls due until none are left."""
+        with self._lock:
+            while self._watches:
+                now = time.monotonic()
+                for job_id, watch in list(self._watches.items()):
+                    if watch.next_sample > now:
+                        continue
                     try:
-                        # Get memory info for process and all children
-                        memory_info = psutil_process.memory_info()
-                        current_memory = memory_info.rss / (
-                            1024 * 1024
-                        )  # Convert to MB
-
-                        # Include children
-                        for child in psutil_process.children(recursive=True):
-                            try:
-                                child_memory = child.memory_info()
-                                current_memory += child_memory.rss / (1024 * 1024)
-                            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                                pass
-
-                        peak_memory = max(peak_memory, current_memory)
-
-                        with self._lock:
-                            self._monitoring[job_id] = {
-                                "current_memory": current_memory,
-                                "peak_memory": peak_memory,
-                            }
-
-                        time.sleep(self.sampling_interval)
-
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        break
+                        current_memory = watch.sample()
+                    except Exception:
+                        current_memory = None
+                    if current_memory is None:
+                        # Process has ended; keep its peak until cleanup()
+                        del self._watches[job_id]
+                        watch.close()
+                        continue
+
+                    previous = self._monitoring.get(job_id)
+                    peak_memory = current_memory
+                    if previous is not None:
+                        peak_memory = max(previous["peak_memory"], current_memory)
+                    self._monitoring[job_id] = {
+                        "current_memory": current_memory,
+                        "peak_memory": peak_memory,
+                    }
 
-            except Exception:
-                # Process might have ended before we could monitor it
-                pass
+                    watch.reschedule(
+                        current_memory, now, self.sampling_interval, self.max_interval
+                    )
 
-        thread = threading.Thread(target=monitor, daemon=True)
-        thread.start()
-        return thread
+                # Releases the lock while waiting, so jobs can come and go
+                next_sample = min(
+                    (watch.next_sample for watch in self._watches.values()),
+                    default=now,
+                )
+                self._wakeup.wait(max(next_sample - time.monotonic(), 0.0))
+            self._sampler = None
 
     def get_peak_memory(self, job_id: str) -> float:
         """Get peak memory usage for a job."""
@@ -421,6 +1045,9 @@ class MemoryMonitor:
         """Clean up monitoring data for a job."""
         with self._lock:
             self._monitoring.pop(job_id, None)
+            watch = self._watches.pop(job_id, None)
+            if watch is not None:
+                watch.close()
 
 
 class Cluster:
@@ -434,6 +1061,10 @@ class Cluster:
         memory: Union[str, int, None] = None,
         verbose: bool = True,
         progress_bar: bool = True,
+        batch_size: int = 1,
+        monitor_memory: bool = True,
+        pin_cpus: bool = False,
+        keep_results: Optional[int] = None,
     ):
         """
         Initialize a compute cluster.
@@ -443,6 +1074,21 @@ class Cluster:
             memory: Memory limit (e.g., "16G", "2048M"). If None, auto-detects.
             verbose: Whether to print progress information.
             progress_bar: Whether to show a progress bar during execution.
+            batch_size: Maximum number of short jobs to run back to back in one
+                        shell process (POSIX only). Only single-CPU commands with
+                        no cwd, env, timeout or output redirection are batched.
+                        Default 1 disables batching.
+            monitor_memory: Whether to sample each job's memory while it runs.
+                            When False, run() reports memory_used as 0.0;
+                            profile() always measures.
+            pin_cpus: Whether to pin each job started by run() to its own CPU
+                      cores (Linux only), so the OS does not migrate it between
+                      cores. A job gets as many cores as its CPU count while
+                      free ones remain; otherwise it runs unpinned.
+            keep_results: Keep only the most recent keep_results completed and
+                          failed results, so very long runs use bounded
+                          memory. Stats and the summary still count every
+                          job. Default None keeps them all.
         """
         # Parse resource specifications
         self.max_cpus = parse_cpu_string(cpus)
@@ -459,9 +1105,12 @@ class Cluster:
 
         self.verbose = verbose
         self.progress_bar = progress_bar
+        self.batch_size = batch_size
+        self.monitor_memory = monitor_memory
+        self.pin_cpus = pin_cpus
 
         # Initialize components
-        self.job_queue = JobQueue()
+        self.job_queue = JobQueue(keep_results)
         self.memory_monitor = MemoryMonitor()
         self.resource_usage = ResourceUsage()
 
@@ -470,7 +1119,7 @@ class Cluster:
 
         # Execution state
         self._running = False
-        self._executor = None
+        self._profiling = False
 
         # Statistics
         self.start_time = None
@@ -488,13 +1137,13 @@ class Cluster:
             self.logger.setLevel(logging.INFO)
 
     @property
-    def completed_jobs(self) -> List[JobResult]:
-        """Get list of completed jobs."""
+    def completed_jobs(self) -> _Results:
+        """Get completed jobs (the most recent keep_results, if set)."""
         return self.job_queue.completed_jobs
 
     @property
-    def failed_jobs(self) -> List[JobResult]:
-        """Get list of failed jobs."""
+    def failed_jobs(self) -> _Results:
+        """Get failed jobs (the most recent keep_results, if set)."""
         return self.job_queue.failed_jobs
 
     @property
@@ -564,6 +1213,10 @@ class Cluster:
         """
         Run all queued jobs with optimal scheduling.
 
+        On Linux and macOS, jobs without a custom cwd are started with
+        posix_spawn() rather than fork()+exec(), which stays fast however
+        large this process grows; setting "cwd" on a job falls back to fork.
+
         Args:
             max_workers: Maximum number of concurrent jobs. If None, uses cluster CPU limit.
 
@@ -577,11 +1230,29 @@ class Cluster:
         self.start_time = time.time()
 
         try:
-            return self._execute_jobs(max_workers)
+            with self._background_logging():
+                return self._execute_jobs(max_workers)
         finally:
             self._running = False
             self.end_time = time.time()
 
+    @contextlib.contextmanager
+    def _background_logging(self):
+        """
+        Route log output through a background thread for the duration of a run.
+
+        The scheduler only enqueues records; a QueueListener thread formats
+        them and does the stream writes and flushes, so bursts of completions
+        never make the scheduling loop wait on string building or terminal
+        I/O. All records are written out before this returns.
+        """
+        if not self.verbose:
+            yield
+            return
+
+        with _queued_logging(self.logger):
+            yield
+
     def _execute_jobs(self, max_workers: Optional[int] = None) -> Dict[str, Any]:
         """Execute all jobs with resource-aware scheduling."""
         if max_workers is None:
@@ -604,82 +1275,151 @@ class Cluster:
         if self.progress_bar and stats["pending"] > 0:
             progress = ProgressBar(stats["pending"])
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            self._executor = executor
-            futures = {}
+        # Worker threads take (ticket, function, args) tasks from work_queue
+        # and report (ticket, outcome) on done_queue, so starting a job is one
+        # put() with no Future or pool lock, and each wake-up costs O(finished)
+        work_queue = queue.SimpleQueue()
+        done_queue = queue.SimpleQueue()
+        workers = []  # started as needed, at most one per running task
 
-            while True:
-                # Check for completed jobs
-                completed_futures = []
-                for future in list(futures.keys()):
-                    if future.done():
-                        completed_futures.append(future)
+        try:
+            running = {}  # ticket -> resources held by the task
+            ticket = 0
+            finished_tasks = ()
+            # Cores not held by a running job, lowest first, when pinning
+            free_cores = []
+            if self.pin_cpus and hasattr(os, "sched_setaffinity"):
+                free_cores = sorted(os.sched_getaffinity(0))
+            pinned = {}  # ticket -> cores its job is pinned to
 
+            while True:
                 # Process completed jobs
-                for future in completed_futures:
-                    job = futures.pop(future)
+                finished = 0
+                for done, results in finished_tasks:
+                    reserved, batch = running.pop(done)
+                    if done in pinned:
+                        free_cores.extend(pinned.pop(done))
+                        free_cores.sort()
                     try:
-                        result = future.result()
-                        self.job_queue.mark_completed(result)
-                        memory_delta = -job["m"] if job["m"] is not None else None
-                        self._update_resource_usage(-job["p"], memory_delta)
-
-                        # Update progress bar
-                        if progress:
-                            progress.update()
-
-                        if self.verbose:
-                            status = "✓" if result.success else "✗"
-                            if isinstance(result.cmd, Pipeline):
-                                cmd_desc = f"Pipeline: {' | '.join([' '.join(c[:2]) for c in result.cmd.commands[:2]])}..."
-                            else:
-                                cmd_desc = " ".join(result.cmd[:3]) + (
-                                    "..." if len(result.cmd) > 3 else ""
+                        if isinstance(results, BaseException):
+                            # The task itself raised; fail its jobs rather
+                            # than leave them marked as running
+                            self.logger.error(f"Error processing job result: {results}")
+                            results = _failed_results(batch, str(results))
+
+                        # A batch of short jobs yields one result per job
+                        if isinstance(results, JobResult):
+                            results = [results]
+
+                        for result in results:
+                            self.job_queue.mark_completed(result)
+                            finished += 1
+
+                            if self.verbose:
+                                self.logger.info(
+                                    "%s %s: %s (%s, %s)",
+                                    "✓" if result.success else "✗",
+                                    result.job_id,
+                                    _Deferred(_describe_cmd, result.cmd),
+                                    _Deferred(format_duration, result.runtime),
+                                    _Deferred(format_memory, result.memory_used),
                                 )
-                            self.logger.info(
-                                f"{status} {result.job_id}: {cmd_desc} "
-                                f"({format_duration(result.runtime)}, {format_memory(result.memory_used)})"
-                            )
 
                     except Exception as e:
                         self.logger.error(f"Error processing job result: {e}")
+                    finally:
+                        memory_delta = (
+                            -reserved["m"] if reserved["m"] is not None else None
+                        )
+                        self._update_resource_usage(-reserved["p"], memory_delta)
+
+                # Redraw the progress bar once for everything that finished
+                if progress and finished:
+                    progress.update(finished)
+
+                # Try to start new jobs, choosing everything that fits at once
+                available_memory = self.max_memory_mb - self.resource_usage.memory_used
+                next_jobs = self.job_queue.get_next_jobs(
+                    self.max_cpus - self.resource_usage.cpu_slots_used,
+                    available_memory,
+                    max_workers - len(running),
+                )
+                # Memory still free once every chosen job holds its share
+                spare_memory = available_memory - sum(
+                    job["m"] or 0 for job in next_jobs
+                )
 
-                # Try to start new jobs
-                while len(futures) < max_workers:
-                    available_cpus = self.max_cpus - self.resource_usage.cpu_slots_used
-                    available_memory = (
-                        self.max_memory_mb - self.resource_usage.memory_used
-                    )
+                for next_job in next_jobs:
+                    # Gather more short jobs to share the same shell process;
+                    # they may raise the batch's reservation by spare_memory
+                    batch = [next_job]
+                    if self.batch_size > 1 and _is_batchable(next_job):
+                        limit = (next_job["m"] or 0) + spare_memory
+                        batch += self.job_queue.take_matching(
+                            _is_batchable, self.batch_size - 1, 1, limit
+                        )
+
+                    # Start the job; a batch runs its jobs one after another,
+                    # so it holds one CPU and the largest memory requirement
+                    if len(batch) > 1:
+                        memory = [job["m"] for job in batch if job["m"] is not None]
+                        reserved = {"p": 1, "m": max(memory) if memory else None}
+                        spare_memory -= (reserved["m"] or 0) - (next_job["m"] or 0)
+                        task = self._execute_batch, batch
+                    else:
+                        reserved = next_job
+                        task = self._execute_single_job, next_job
+                    # Pin only when the job can have all its cores; a job
+                    # squeezed onto fewer would run slower than unpinned
+                    cores = []
+                    if len(free_cores) >= reserved["p"]:
+                        cores = free_cores[: reserved["p"]]
+                        del free_cores[: reserved["p"]]
+                    ticket += 1
+                    work_queue.put((ticket, *task, cores))
+                    running[ticket] = reserved, batch
+                    if len(workers) < len(running):
+                        worker = threading.Thread(
+                            target=_worker, args=(work_queue, done_queue), daemon=True
+                        )
+                        worker.start()
+                        workers.append(worker)
+                    if cores:
+                        pinned[ticket] = cores
+                    self._update_resource_usage(reserved["p"], reserved["m"])
+
+                    for job in batch:
+                        self.job_queue.mark_running(job)
 
-                    next_job = self.job_queue.get_next_job(
-                        available_cpus, available_memory
-                    )
-                    if next_job is None:
-                        break
-
-                    # Start the job
-                    future = executor.submit(self._execute_single_job, next_job)
-                    futures[future] = next_job
-
-                    self.job_queue.mark_running(next_job)
-                    self._update_resource_usage(next_job["p"], next_job["m"])
-
-                    if self.verbose:
-                        cmd = next_job["cmd"]
-                        if isinstance(cmd, Pipeline):
-                            cmd_desc = f"Pipeline: {' | '.join([' '.join(c[:2]) for c in cmd.commands[:2]])}..."
-                        else:
-                            cmd_desc = " ".join(cmd[:3]) + (
-                                "..." if len(cmd) > 3 else ""
+                        if self.verbose:
+                            self.logger.info(
+                                "→ Started %s: %s",
+                                job["id"],
+                                _Deferred(_describe_cmd, job["cmd"]),
                             )
-                        self.logger.info(f"→ Started {next_job['id']}: {cmd_desc}")
 
                 # Check if we're done
-                if not futures and self.job_queue.get_stats()["pending"] == 0:
+                # Jobs may be added while others run (even by a callable job),
+                # so only ask the queue once nothing is left running
+                if not running and self.job_queue.get_stats()["pending"] == 0:
                     break
 
-                # Brief pause to avoid busy waiting
-                time.sleep(0.1)
+                if running:
+                    # Block until a running job finishes, then take any others
+                    # that finished meanwhile
+                    finished_tasks = [done_queue.get()]
+                    while not done_queue.empty():
+                        finished_tasks.append(done_queue.get())
+                else:
+                    # Nothing running and nothing fits yet; avoid busy waiting
+                    finished_tasks = ()
+                    time.sleep(0.1)
+        finally:
+            # Each worker exits at its sentinel once its current task is done
+            for worker in workers:
+                work_queue.put(None)
+            for worker in workers:
+                worker.join()
 
         # Finish progress bar
         if progress:
@@ -697,20 +1437,28 @@ class Cluster:
 
         return final_stats
 
-    def _execute_single_job(self, job: Dict[str, Any]) -> JobResult:
-        """Execute a single job and return results."""
+    def _execute_single_job(
+        self, job: Dict[str, Any], cores: Optional[List[int]] = None
+    ) -> JobResult:
+        """Execute a single job, pinned to cores if given, and return results."""
         job_id = job["id"]
         cmd = job["cmd"]
 
         result = JobResult(
             job_id=job_id, cmd=cmd, cpu_used=job["p"], start_time=time.time()
         )
+        start_ns = time.perf_counter_ns()
 
         try:
-            # Check if this is a pipeline or single command
-            if isinstance(cmd, Pipeline):
+            # Check if this is a Python callable, a pipeline or single command
+            if callable(cmd):
+                # Nothing to spawn or monitor: run it on this worker thread
+                processes = []
+                result.value = cmd()
+                result.success = True
+            elif isinstance(cmd, Pipeline):
                 # Execute pipeline
-                processes, monitor_thread = self._execute_pipeline(job_id, cmd, job)
+                processes = self._execute_pipeline(job_id, cmd, job, cores)
 
                 # Wait for completion with optional timeout
                 timeout = job.get("timeout")
@@ -723,12 +1471,12 @@ class Cluster:
                     if job.get("stdout"):
                         result.stdout = f"[Output redirected to {job['stdout']}]"
                     else:
-                        result.stdout = stdout
+                        result.stdout = stdout or ""
 
                     if job.get("stderr"):
                         result.stderr = f"[Error output redirected to {job['stderr']}]"
                     else:
-                        result.stderr = stderr
+                        result.stderr = stderr or ""
 
                     result.returncode = last_process.returncode
                     result.success = last_process.returncode == 0
@@ -761,21 +1509,19 @@ class Cluster:
                     if job.get("stdout"):
                         result.stdout = f"[Output redirected to {job['stdout']}]"
                     else:
-                        result.stdout = stdout
+                        result.stdout = stdout or ""
 
                     if job.get("stderr"):
                         result.stderr = f"[Error output redirected to {job['stderr']}]"
                     else:
-                        result.stderr = stderr
+                        result.stderr = stderr or ""
 
                     result.returncode = -1
                     result.success = False
                     result.error = f"Pipeline timed out after {timeout} seconds"
             else:
                 # Execute single command
-                processes, monitor_thread = self._execute_single_command(
-                    job_id, cmd, job
-                )
+                processes = self._execute_single_command(job_id, cmd, job, cores)
                 process = processes[0]
 
                 # Wait for completion with optional timeout
@@ -787,12 +1533,12 @@ class Cluster:
                     if job.get("stdout"):
                         result.stdout = f"[Output redirected to {job['stdout']}]"
                     else:
-                        result.stdout = stdout
+                        result.stdout = stdout or ""
 
                     if job.get("stderr"):
                         result.stderr = f"[Error output redirected to {job['stderr']}]"
                     else:
-                        result.stderr = stderr
+                        result.stderr = stderr or ""
 
                     result.returncode = process.returncode
                     result.success = process.returncode == 0
@@ -805,24 +1551,24 @@ class Cluster:
                     if job.get("stdout"):
                         result.stdout = f"[Output redirected to {job['stdout']}]"
                     else:
-                        result.stdout = stdout
+                        result.stdout = stdout or ""
 
                     if job.get("stderr"):
                         result.stderr = f"[Error output redirected to {job['stderr']}]"
                     else:
-                        result.stderr = stderr
+                        result.stderr = stderr or ""
 
                     result.returncode = -1
                     result.success = False
                     result.error = f"Job timed out after {timeout} seconds"
 
-            # Wait for monitoring thread to finish
-            if monitor_thread:
-                monitor_thread.join(timeout=1.0)
-
-            # Get memory usage
-            result.memory_used = self.memory_monitor.get_peak_memory(job_id)
-            self.memory_monitor.cleanup(job_id)
+            # Get memory usage: the sampled peak of the whole process tree,
+            # or the kernel's own peak if sampling missed a spike
+            if self.monitor_memory or self._profiling:
+                result.memory_used = max(
+                    self.memory_monitor.get_peak_memory(job_id),
+                    _peak_rss_mb(processes),
+                )
 
         except Exception as e:
             result.success = False
@@ -830,16 +1576,90 @@ class Cluster:
             result.returncode = -1
 
         finally:
-            result.end_time = time.time()
-            result.runtime = result.end_time - result.start_time
+            self.memory_monitor.cleanup(job_id)
+            result.runtime_ns = time.perf_counter_ns() - start_ns
+            result.end_time = result.start_time + result.runtime
 
         return result
 
-    def _execute_single_command(self, job_id: str, cmd: List[str], job: Dict[str, Any]):
-        """Execute a single command and return process and monitor thread."""
+    def _execute_batch(
+        self, jobs: List[Dict[str, Any]], cores: Optional[List[int]] = None
+    ) -> List[JobResult]:
+        """
+        Run several short jobs back to back in one shell and split the results.
+
+        After each command the shell writes a marker line carrying its exit
+        status to stdout, and a bare marker line to stderr, so each job gets
+        its own output and return code back. Each job is given an equal share
+        of the batch's runtime; memory usage is the whole batch's peak.
+        """
+        marker = f"--mpmsub-{uuid.uuid4().hex}--"
+        script = [f"m={marker}"]
+        try:
+            for job in jobs:
+                discard = "" if job.get("capture_output", True) else " >/dev/null 2>&1"
+                argv = [_batch_program(job["cmd"]), *job["cmd"][1:]]
+                script.append(
+                    f"{shlex.join(argv)}{discard}; rc=$?; "
+                    r"""printf '\n%s %d\n' "$m" "$rc"; printf '\n%s\n' "$m" >&2"""
+                )
+        except Exception as e:
+            return _failed_results(jobs, f"Could not build batch script: {e}")
+
+        batch = self._execute_single_job(
+            {
+                "id": f"{jobs[0]['id']}_batch",
+                "cmd": ["/bin/sh", "-c", "\n".join(script)],
+                "p": 1,
+            },
+            cores,
+        )
+
+        # stdout alternates [output, exit status, output, exit status, ...]
+        stdouts = re.split(rf"\n{marker} (\d+)\n", batch.stdout or "")
+        stderrs = (batch.stderr or "").split(f"\n{marker}\n")
+
+        # The shell has no portable clock finer than a second, so split the
+        # batch's wall time evenly, laying the jobs end to end
+        share_ns = batch.runtime_ns // len(jobs)
+        results = []
+        for i, job in enumerate(jobs):
+            start_time = batch.start_time + i * share_ns / 1e9
+            result = JobResult(
+                job_id=job["id"],
+                cmd=job["cmd"],
+                cpu_used=1,
+                runtime_ns=share_ns,
+                memory_used=batch.memory_used,
+                start_time=start_time,
+                end_time=start_time + share_ns / 1e9,
+            )
+            if 2 * i + 1 < len(stdouts):
+                result.stdout = stdouts[2 * i]
+                result.stderr = stderrs[i] if i < len(stderrs) else ""
+                result.returncode = int(stdouts[2 * i + 1])
+                result.success = result.returncode == 0
+            else:
+                # The shell stopped before reaching this job
+                result.returncode = -1
+                result.error = (
+                    batch.error
+                    or f"Batch shell exited with code {batch.returncode} before this job ran"
+                )
+            results.append(result)
+
+        return results
+
+    def _execute_single_command(
+        self,
+        job_id: str,
+        cmd: List[str],
+        job: Dict[str, Any],
+        cores: Optional[List[int]] = None,
+    ):
+        """Execute a single command and return its process."""
         # Handle stdout/stderr redirection
-        stdout_dest = subprocess.PIPE
-        stderr_dest = subprocess.PIPE
+        stdout_dest = stderr_dest = _output_dest(job)
 
         if job.get("stdout"):
             stdout_dest = open(job["stdout"], "w")
@@ -853,23 +1673,41 @@ class Cluster:
             "text": True,
             "cwd": job.get("cwd"),
             "env": job.get("env"),
+            # Descriptors Python opens are non-inheritable (PEP 446), so the
+            # child has nothing stray to close; this keeps posix_spawn usable
+            "close_fds": False,
         }
 
         # Start the process
-        process = subprocess.Popen(cmd, **subprocess_kwargs)
+        try:
+            process = _RusagePopen(
+                cmd,
+                executable=_resolve_executable(cmd, job.get("env")),
+                **subprocess_kwargs,
+            )
+        finally:
+            # The child has its own copy of any redirect file; don't keep
+            # ours open for the length of the job
+            _close_redirects(stdout_dest, stderr_dest)
+        _pin(process, cores)
 
         # Start memory monitoring
-        monitor_thread = self.memory_monitor.start_monitoring(job_id, process)
+        self._start_monitoring(job_id, process)
 
-        return [process], monitor_thread
+        return [process]
 
-    def _execute_pipeline(self, job_id: str, pipeline: Pipeline, job: Dict[str, Any]):
-        """Execute a pipeline of commands and return processes and monitor thread."""
+    def _execute_pipeline(
+        self,
+        job_id: str,
+        pipeline: Pipeline,
+        job: Dict[str, Any],
+        cores: Optional[List[int]] = None,
+    ):
+        """Execute a pipeline of commands and return its processes."""
         processes = []
 
         # Handle stdout/stderr redirection for the final command
-        final_stdout = subprocess.PIPE
-        final_stderr = subprocess.PIPE
+        final_stdout = final_stderr = _output_dest(job)
 
         if job.get("stdout"):
             final_stdout = open(job["stdout"], "w")
@@ -881,46 +1719,54 @@ class Cluster:
             "text": True,
             "cwd": job.get("cwd"),
             "env": job.get("env"),
+            "close_fds": False,  # see _execute_single_command
         }
 
+        # Stages are joined by plain OS pipes, so the kernel moves data from
+        # one child to the next and the parent only ever reads the last
+        # stage. Nothing drains the earlier stages' stderr, so it goes to
+        # DEVNULL rather than a pipe that could fill up and stall them.
+        stdin_fd = None  # read end of the pipe from the previous stage
         try:
             # Create processes for the pipeline
             for i, cmd in enumerate(pipeline.commands):
-                if i == 0:
-                    # First command: stdin from parent, stdout to pipe
-                    kwargs = {
-                        **base_kwargs,
-                        "stdout": subprocess.PIPE,
-                        "stderr": subprocess.PIPE,
-                    }
-                elif i == len(pipeline.commands) - 1:
-                    # Last command: stdin from previous pipe, stdout/stderr captured or redirected
-                    kwargs = {
-                        **base_kwargs,
-                        "stdin": processes[i - 1].stdout,
-                        "stdout": final_stdout,
-                        "stderr": final_stderr,
-                    }
+                if i == len(pipeline.commands) - 1:
+                    # Last command: stdout/stderr captured or redirected
+                    next_stdin_fd = None
+                    stdout_dest, stderr_dest = final_stdout, final_stderr
                 else:
-                    # Middle command: stdin from previous pipe, stdout to pipe
-                    kwargs = {
-                        **base_kwargs,
-                        "stdin": processes[i - 1].stdout,
-                        "stdout": subprocess.PIPE,
-                        "stderr": subprocess.PIPE,
-                    }
+                    next_stdin_fd, stdout_dest = os.pipe()
+                    stderr_dest = subprocess.DEVNULL
 
-                process = subprocess.Popen(cmd, **kwargs)
+                try:
+                    process = _RusagePopen(
+                        cmd,
+                        executable=_resolve_executable(cmd, job.get("env")),
+                        stdin=stdin_fd,
+                        stdout=stdout_dest,
+                        stderr=stderr_dest,
+                        **base_kwargs,
+                    )
+                except Exception:
+                    if next_stdin_fd is not None:
+                        os.close(next_stdin_fd)
+                    raise
+                finally:
+                    # The children hold their own copies; closing ours lets a
+                    # writer get SIGPIPE once its reader exits
+                    if stdin_fd is not None:
+                        os.close(stdin_fd)
+                    if next_stdin_fd is not None:
+                        os.close(stdout_dest)
+
+                stdin_fd = next_stdin_fd
                 processes.append(process)
-
-                # Close the previous process's stdout to allow it to receive SIGPIPE
-                if i > 0:
-                    processes[i - 1].stdout.close()
+                _pin(process, cores)
 
             # Start memory monitoring on the last process (which will capture the whole pipeline)
-            monitor_thread = self.memory_monitor.start_monitoring(job_id, processes[-1])
+            self._start_monitoring(job_id, processes[-1])
 
-            return processes, monitor_thread
+            return processes
 
         except Exception as e:
             # Clean up any processes that were started
@@ -931,6 +1777,14 @@ class Cluster:
                     pass
             raise e
 
+        finally:
+            _close_redirects(final_stdout, final_stderr)
+
+    def _start_monitoring(self, job_id: str, process: subprocess.Popen):
+        """Start memory monitoring unless it is turned off for run()."""
+        if self.monitor_memory or self._profiling:
+            self.memory_monitor.start_monitoring(job_id, process)
+
     def _update_resource_usage(self, cpu_delta: int, memory_delta: Optional[float]):
         """Update resource usage tracking."""
         self.resource_usage.cpu_slots_used += cpu_delta
@@ -966,32 +1820,27 @@ class Cluster:
         print(f"  ✗ Failed: {job_stats['failed']}")
 
         if job_stats["completed"] > 0:
-            # Performance statistics
-            completed = self.completed_jobs
-            runtimes = [job.runtime for job in completed]
-            memories = [job.memory_used for job in completed]
+            # Performance statistics, from totals kept as jobs finished
+            count = job_stats["completed"]
+            totals = self.job_queue.get_totals()
 
             print("\nPerformance:")
-            print(
-                f"  Average runtime: {format_duration(sum(runtimes) / len(runtimes))}"
-            )
-            print(f"  Total CPU time: {format_duration(sum(runtimes))}")
-            if memories:
-                print(f"  Peak memory: {format_memory(max(memories))}")
-                print(
-                    f"  Average memory: {format_memory(sum(memories) / len(memories))}"
-                )
+            print(f"  Average runtime: {format_duration(totals['runtime'] / count)}")
+            print(f"  Total CPU time: {format_duration(totals['runtime'])}")
+            print(f"  Peak memory: {format_memory(totals['peak_memory'])}")
+            print(f"  Average memory: {format_memory(totals['memory'] / count)}")
 
         if job_stats["failed"] > 0:
             print("\nFailed jobs:")
-            for job in self.failed_jobs[:5]:  # Show first 5 failures
+            shown = list(islice(self.failed_jobs, 5))  # Show first 5 failures
+            for job in shown:
                 print(f"  ✗ {job.job_id}: {job.error or f'Exit code {job.returncode}'}")
-            if len(self.failed_jobs) > 5:
-                print(f"  ... and {len(self.failed_jobs) - 5} more")
+            if job_stats["failed"] > len(shown):
+                print(f"  ... and {job_stats['failed'] - len(shown)} more")
 
         print("=" * 60)
 
-    def profile(self, verbose: bool = True) -> List[JobResult]:
+    def profile(self, verbose: bool = True, max_workers: int = 1) -> List[JobResult]:
         """
         Profile jobs by running them sequentially to measure actual resource usage.
 
@@ -999,11 +1848,16 @@ class Cluster:
         Jobs are run one at a time (respecting CPU requirements) to get accurate
         memory measurements without interference.
 
+        Each job's memory is measured over its own process tree, so for many
+        short jobs max_workers > 1 can overlap their startup costs; timings are
+        then less representative because the jobs compete for the machine.
+
         Args:
             verbose: Whether to print progress information.
+            max_workers: Number of jobs to profile at once (default: 1).
 
         Returns:
-            List[JobResult]: Results from profiling run with actual memory usage.
+            List[JobResult]: _Results from profiling run with actual memory usage.
         """
         if self._running:
             raise RuntimeError("Cannot profile while cluster is running")
@@ -1017,34 +1871,33 @@ class Cluster:
         if verbose:
             print("MPMSUB PROFILING MODE")
             print("=" * 40)
-            print(f"Profiling {stats['pending']} jobs sequentially")
+            if max_workers > 1:
+                print(f"Profiling {stats['pending']} jobs, {max_workers} at a time")
+            else:
+                print(f"Profiling {stats['pending']} jobs sequentially")
             print("This will measure actual memory usage for each job")
             print("Use these measurements to set 'm' values for efficient scheduling\n")
 
         self._running = True
+        self._profiling = True
         self.start_time = time.time()
 
         try:
-            return self._profile_jobs(verbose)
+            return self._profile_jobs(verbose, max_workers)
         finally:
             self._running = False
+            self._profiling = False
             self.end_time = time.time()
 
-    def _profile_jobs(self, verbose: bool) -> List[JobResult]:
-        """Execute jobs sequentially for profiling."""
+    def _profile_jobs(self, verbose: bool, max_workers: int = 1) -> List[JobResult]:
+        """Execute jobs for profiling, sequentially unless max_workers > 1."""
         profile_results = []
 
         # Get all pending jobs
         jobs_to_profile = []
         while True:
             # Get next job (ignoring memory constraints for profiling)
-            next_job = None
-            with self.job_queue._lock:
-                for i, job in enumerate(self.job_queue.pending_jobs):
-                    if job["p"] <= self.max_cpus:  # Only check CPU constraint
-                        next_job = self.job_queue.pending_jobs.pop(i)
-                        break
-
+            next_job = self.job_queue.get_next_job(self.max_cpus, float("inf"))
             if next_job is None:
                 break
 
@@ -1058,42 +1911,39 @@ class Cluster:
         if self.progress_bar and len(jobs_to_profile) > 0:
             progress = ProgressBar(len(jobs_to_profile))
 
-        # Execute jobs one by one
-        for i, job in enumerate(jobs_to_profile, 1):
-            if verbose:
-                print(
-                    f"[{i}/{len(jobs_to_profile)}] Profiling {job['id']}: {' '.join(job['cmd'][:3])}..."
-                )
-
-            # Mark as running
-            self.job_queue.mark_running(job)
-
-            # Execute the job
-            result = self._execute_single_job(job)
-
-            # Mark as completed
-            self.job_queue.mark_completed(result)
-            profile_results.append(result)
-
-            # Update progress bar
-            if progress:
-                progress.update()
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {}
+                for job in jobs_to_profile:
+                    self.job_queue.mark_running(job)
+                    futures[executor.submit(self._execute_single_job, job)] = job
+
+                # Report jobs as they finish
+                for i, future in enumerate(as_completed(futures), 1):
+                    job = futures[future]
+                    if verbose:
+                        print(
+                            f"[{i}/{len(jobs_to_profile)}] Profiled {job['id']}: {_describe_cmd(job['cmd'])}"
+                        )
+                    self._record_profile_result(future.result(), progress, verbose)
+
+            # Return results in submission order, as the sequential path does
+            profile_results = [future.result() for future in futures]
+        else:
+            # Execute jobs one by one
+            for i, job in enumerate(jobs_to_profile, 1):
+                if verbose:
+                    print(
+                        f"[{i}/{len(jobs_to_profile)}] Profiling {job['id']}: {_describe_cmd(job['cmd'])}"
+                    )
 
-            if verbose:
-                status = "✓" if result.success else "✗"
-                memory_str = (
-                    format_memory(result.memory_used)
-                    if result.memory_used > 0
-                    else "< 1M"
-                )
-                print(
-                    f"  {status} Runtime: {format_duration(result.runtime)}, "
-                    f"Memory: {memory_str}"
-                )
+                # Mark as running
+                self.job_queue.mark_running(job)
 
-                if not result.success and result.error:
-                    print(f"    Error: {result.error}")
-                print()
+                # Execute the job
+                result = self._execute_single_job(job)
+                self._record_profile_result(result, progress, verbose)
+                profile_results.append(result)
 
         # Finish progress bar
         if progress:
@@ -1104,6 +1954,30 @@ class Cluster:
 
         return profile_results
 
+    def _record_profile_result(
+        self, result: JobResult, progress: Optional[ProgressBar], verbose: bool
+    ):
+        """Mark a profiled job as completed and report it."""
+        self.job_queue.mark_completed(result)
+
+        # Update progress bar
+        if progress:
+            progress.update()
+
+        if verbose:
+            status = "✓" if result.success else "✗"
+            memory_str = (
+                format_memory(result.memory_used) if result.memory_used > 0 else "< 1M"
+            )
+            print(
+                f"  {status} Runtime: {format_duration(result.runtime)}, "
+                f"Memory: {memory_str}"
+            )
+
+            if not result.success and result.error:
+                print(f"    Error: {result.error}")
+            print()
+
     def _print_profile_summary(self, results: List[JobResult]):
         """Print profiling summary with memory recommendations."""
         print("\n" + "=" * 60)
@@ -1121,26 +1995,36 @@ class Cluster:
             print("\nMemory Usage Analysis:")
             print("-" * 30)
 
-            memories = [r.memory_used for r in successful_results if r.memory_used > 0]
-            if memories:
-                print(f"Peak memory usage: {format_memory(max(memories))}")
-                print(
-                    f"Average memory usage: {format_memory(sum(memories) / len(memories))}"
-                )
-                print(f"Minimum memory usage: {format_memory(min(memories))}")
-
-            print("\nRecommended Memory Settings:")
-            print("-" * 30)
-
+            # One pass gathers the statistics and the recommendation lines,
+            # which are then printed with a single write
+            measured = 0
+            total = peak = 0.0
+            lowest = float("inf")
+            recommendations = []
             for result in successful_results:
-                if result.memory_used > 0:
+                memory = result.memory_used
+                if memory > 0:
+                    measured += 1
+                    total += memory
+                    if memory > peak:
+                        peak = memory
+                    if memory < lowest:
+                        lowest = memory
                     # Add 20% buffer to measured memory
-                    recommended = int(result.memory_used * 1.2)
-                    recommended_str = format_memory(recommended)
+                    recommended_str = format_memory(int(memory * 1.2))
                 else:
                     recommended_str = "50M"  # Minimum for very light jobs
 
-                print(f"{result.job_id}: 'm': '{recommended_str}'")
+                recommendations.append(f"{result.job_id}: 'm': '{recommended_str}'")
+
+            if measured:
+                print(f"Peak memory usage: {format_memory(peak)}")
+                print(f"Average memory usage: {format_memory(total / measured)}")
+                print(f"Minimum memory usage: {format_memory(lowest)}")
+
+            print("\nRecommended Memory Settings:")
+            print("-" * 30)
+            print("\n".join(recommendations))
 
         print("=" * 60)
 
@@ -1153,11 +2037,10 @@ class JobList:
 
     def append(self, job: Union[Dict[str, Any], Job]) -> str:
         """Add a job to the queue. Accepts both Job objects and dictionaries."""
-        if isinstance(job, Job):
-            job_dict = job.to_dict()
-        else:
-            job_dict = job
-        return self._queue.add_job(job_dict)
+        # Exact type check first: isinstance() is slower on the common path
+        if type(job) is Job or isinstance(job, Job):
+            job = job.to_dict()
+        return self._queue.add_job(job)
 
     def extend(self, jobs: List[Union[Dict[str, Any], Job]]) -> List[str]:
         """Add multiple jobs to the queue. Accepts both Job objects and dictionaries."""
@@ -1165,7 +2048,7 @@ class JobList:
 
     def __len__(self) -> int:
         """Get number of pending jobs."""
-        return len(self._queue.pending_jobs)
+        return self._queue.get_stats()["pending"]
 
     def __iter__(self):
         """Iterate over pending jobs."""
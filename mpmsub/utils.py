@@ -2,12 +2,24 @@
 Utility functions for mpmsub library.
 """
 
+import functools
 import platform
 import re
 import subprocess
+import sys
 from typing import Optional, Union
 
-import psutil
+# Number followed by an optional unit, e.g. "16G", "2048M", "1.5g", "512 MB"
+_MEMORY_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$", re.IGNORECASE)
+
+# Multipliers converting each unit to MB
+_MEMORY_UNITS_MB = {
+    "": 1,  # Assume MB if no unit
+    "K": 1 / 1024,  # KB to MB
+    "M": 1,  # MB
+    "G": 1024,  # GB to MB
+    "T": 1024 * 1024,  # TB to MB
+}
 
 
 def parse_memory_string(memory: Union[str, int, None]) -> Optional[int]:
@@ -38,30 +50,22 @@ def parse_memory_string(memory: Union[str, int, None]) -> Optional[int]:
         return memory
 
     if isinstance(memory, str):
-        memory = memory.strip().upper()
-
-        # Match number followed by optional unit
-        match = re.match(r"^(\d+(?:\.\d+)?)\s*([KMGT]?)B?$", memory)
-        if not match:
-            raise ValueError(f"Invalid memory specification: {memory}")
-
-        value, unit = match.groups()
-        value = float(value)
-
-        # Convert to MB
-        multipliers = {
-            "": 1,  # Assume MB if no unit
-            "K": 1 / 1024,  # KB to MB
-            "M": 1,  # MB
-            "G": 1024,  # GB to MB
-            "T": 1024 * 1024,  # TB to MB
-        }
-
-        return int(value * multipliers[unit])
+        return _parse_memory_str(memory)
 
     raise ValueError(f"Invalid memory specification type: {type(memory)}")
 
 
+# Job lists repeat a handful of specs like "1G" or "512M", so remember them
+@functools.lru_cache(maxsize=256)
+def _parse_memory_str(memory: str) -> int:
+    match = _MEMORY_RE.match(memory)
+    if not match:
+        raise ValueError(f"Invalid memory specification: {memory.strip().upper()}")
+
+    value, unit = match.groups()
+    return int(float(value) * _MEMORY_UNITS_MB[unit.upper()])
+
+
 def parse_cpu_string(cpus: Union[str, int, None]) -> Optional[int]:
     """
     Parse CPU specification.
@@ -154,6 +158,9 @@ def get_system_resources():
         dict: Dictionary with 'cpus' and 'memory_mb' keys.
     """
     try:
+        # Imported here so that importing mpmsub does not load psutil
+        import psutil
+
         memory = psutil.virtual_memory()
         available_mb = _get_available_memory_mb(memory)
         return {
@@ -216,13 +223,19 @@ def format_duration(seconds: float) -> str:
         return f"{seconds:.1f}s"
 
 
+def _intern(value):
+    """Intern plain strings so identical values across jobs share one object."""
+    return sys.intern(value) if type(value) is str else value
+
+
 def validate_job(job: dict) -> dict:
     """
     Validate and normalize a job specification.
 
     Args:
         job: Job dictionary with 'cmd', 'p', 'm' keys.
-             'cmd' can be a list of strings or a Pipeline object.
+             'cmd' can be a list of strings, a Pipeline object, or a
+             Python callable taking no arguments.
 
     Returns:
         dict: Normalized job specification.
@@ -253,8 +266,8 @@ def validate_job(job: dict) -> dict:
         # Single command validation
         if not cmd:
             raise ValueError("Job 'cmd' must be a non-empty list")
-    else:
-        raise ValueError("Job 'cmd' must be a list or Pipeline object")
+    elif not callable(cmd):
+        raise ValueError("Job 'cmd' must be a list, Pipeline object or callable")
 
     # Validate and parse CPU requirement
     cpus = parse_cpu_string(job.get("p", 1))
@@ -270,17 +283,23 @@ def validate_job(job: dict) -> dict:
     elif memory_mb < 1:
         raise ValueError("Job memory requirement must be >= 1MB")
 
+    # Large queues tend to repeat the same arguments and working directories;
+    # intern them so each distinct string is stored once
+    if isinstance(cmd, list):
+        cmd = [_intern(arg) for arg in cmd]
+
     # Return normalized job
     normalized = {
         "cmd": cmd,
         "p": cpus,
         "m": memory_mb,
-        "id": job.get("id"),
-        "cwd": job.get("cwd"),
+        "id": _intern(job.get("id")),
+        "cwd": _intern(job.get("cwd")),
         "env": job.get("env"),
         "timeout": job.get("timeout"),
         "stdout": job.get("stdout"),
         "stderr": job.get("stderr"),
+        "capture_output": job.get("capture_output", True),
     }
 
     return normalized
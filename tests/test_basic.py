@@ -3,8 +3,12 @@
 Basic tests for mpmsub library.
 """
 
+import logging
 import os
+import pathlib
 import sys
+import threading
+import time
 
 import pytest
 
@@ -103,6 +107,200 @@ class TestCluster:
         assert "hello" in outputs
         assert "world" in outputs
 
+    @pytest.mark.skipif(os.name != "posix", reason="batching needs /bin/sh")
+    def test_batched_execution(self):
+        """Test that batched jobs keep their own output and exit status."""
+        p = mpmsub.Cluster(cpus=1, memory="1G", verbose=False, batch_size=8)
+
+        p.jobs.append({"cmd": ["echo", "hello world"], "id": "hello"})
+        p.jobs.append({"cmd": ["sh", "-c", "echo oops >&2; exit 3"], "id": "fail"})
+        p.jobs.append({"cmd": ["printf", "no newline"], "id": "printf"})
+        p.jobs.append({"cmd": ["echo", "alone"], "id": "alone", "timeout": 10})
+
+        p.run()
+
+        results = {r.job_id: r for r in p.completed_jobs + p.failed_jobs}
+        assert results["hello"].success
+        assert results["hello"].stdout == "hello world\n"
+        assert results["fail"].returncode == 3
+        assert results["fail"].stderr == "oops\n"
+        assert results["printf"].stdout == "no newline"
+        # The batch's runtime is shared out, one job after another
+        assert results["hello"].end_time <= results["printf"].start_time
+        assert results["alone"].stdout == "alone\n"  # not batchable, ran alone
+        assert len(p.failed_jobs) == 1
+        assert p.resource_usage.cpu_slots_used == 0
+
+        # Arguments shlex.join() cannot quote keep a job out of the batch
+        p.jobs.append({"cmd": ["echo", pathlib.Path("path")], "id": "path"})
+        p.jobs.append({"cmd": ["echo", "text"], "id": "text"})
+        p.run()
+
+        results = {r.job_id: r for r in p.completed_jobs}
+        assert results["path"].stdout == "path\n"
+        assert results["text"].stdout == "text\n"
+
+    def test_batched_matches_unbatched(self):
+        """Test that batching does not change what a command does."""
+        cmds = {
+            "builtin": ["kill", "-s"],  # also a shell builtin
+            "missing": ["mpmsub-no-such-program"],
+            "echo": ["echo", "done"],
+        }
+        runs = []
+        for batch_size in (1, 8):
+            p = mpmsub.Cluster(cpus=1, memory="1G", verbose=False, batch_size=batch_size)
+            for job_id, cmd in cmds.items():
+                p.jobs.append({"cmd": cmd, "id": job_id})
+            p.run()
+            results = {r.job_id: r for r in p.completed_jobs + p.failed_jobs}
+            runs.append({k: (r.returncode, r.stdout) for k, r in results.items()})
+
+        assert runs[0] == runs[1]
+        assert runs[1]["missing"] == (-1, "")
+
+    @pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs wait4()")
+    def test_short_memory_spike(self):
+        """Test that a job too short to be sampled still reports its peak."""
+        p = mpmsub.Cluster(cpus=1, memory="1G", verbose=False)
+        p.jobs.append({"cmd": [sys.executable, "-c", "x = bytearray(64 << 20)"]})
+
+        p.run()
+
+        assert p.completed_jobs[0].memory_used >= 64
+
+    def test_output_not_captured(self):
+        """Test that output is discarded when capture_output is False."""
+        p = mpmsub.Cluster(cpus=1, memory="1G", verbose=False)
+        p.jobs.append({"cmd": ["echo", "dropped"], "capture_output": False})
+        p.jobs.append(mpmsub.job(["echo", "kept"]))
+
+        p.run()
+
+        outputs = sorted(job.stdout for job in p.completed_jobs)
+        assert outputs == ["", "kept\n"]
+
+    def test_memory_monitoring_disabled(self):
+        """Test that run() skips memory sampling when monitor_memory is False."""
+        p = mpmsub.cluster(p=1, m="1G", verbose=False, monitor_memory=False)
+        p.jobs.append({"cmd": ["sleep", "0.2"]})
+
+        p.run()
+
+        assert len(p.completed_jobs) == 1
+        assert p.completed_jobs[0].memory_used == 0.0
+
+    @pytest.mark.skipif(
+        not hasattr(os, "sched_setaffinity"), reason="needs sched_setaffinity()"
+    )
+    def test_pin_cpus(self):
+        """Test that pinned jobs run on cores of their own."""
+        p = mpmsub.Cluster(cpus=1, memory="1G", verbose=False, pin_cpus=True)
+        show = "import os; print(sorted(os.sched_getaffinity(0)))"
+        p.jobs.append({"cmd": [sys.executable, "-c", show]})
+
+        p.run()
+
+        assert p.completed_jobs[0].stdout == f"{[min(os.sched_getaffinity(0))]}\n"
+
+    def test_keep_results(self):
+        """Test that only the most recent results are kept, but all counted."""
+        p = mpmsub.cluster(p=1, m="1G", verbose=False, keep_results=2)
+        for i in range(3):
+            p.jobs.append({"cmd": ["echo", str(i)], "id": f"ok{i}"})
+        p.jobs.append({"cmd": ["false"], "id": "bad"})
+
+        results = p.run()
+
+        assert [job.job_id for job in p.completed_jobs] == ["ok1", "ok2"]
+        assert [job.job_id for job in p.failed_jobs] == ["bad"]
+        assert results["jobs"]["completed"] == 3
+        assert results["jobs"]["total"] == 4
+
+    def test_env_cache_released(self):
+        """Test that per-job environments are not held after the run."""
+        p = mpmsub.cluster(p=1, m="1G", verbose=False, keep_results=1)
+        for i in range(5):
+            p.jobs.append({"cmd": ["true"], "env": {**os.environ, "SAMPLE": str(i)}})
+
+        p.run()
+
+        assert p.job_queue._envs == {}
+
+    def test_callable_job(self):
+        """Test that Python callables run in-process and keep their value."""
+        p = mpmsub.cluster(p=2, m="1G", verbose=False)
+        p.jobs.append({"cmd": lambda: 6 * 7, "id": "answer"})
+        p.jobs.append(mpmsub.Job(func=lambda: 1 / 0, id="broken"))
+
+        p.run()
+
+        assert [job.value for job in p.completed_jobs[:2]] == [42]  # still a list
+        assert p.failed_jobs[0].job_id == "broken"
+        assert "division by zero" in p.failed_jobs[0].error
+
+    def test_callable_job_sys_exit(self):
+        """Test that a callable calling sys.exit() fails instead of hanging."""
+        p = mpmsub.cluster(p=1, m="1G", verbose=False)
+        p.jobs.append({"cmd": lambda: sys.exit(2), "id": "exits"})
+        p.jobs.append({"cmd": lambda: 1, "id": "after"})
+
+        p.run()
+
+        assert [job.job_id for job in p.failed_jobs] == ["exits"]
+        assert [job.job_id for job in p.completed_jobs] == ["after"]
+
+    def test_job_added_during_run(self):
+        """Test that jobs appended while run() is going still get run."""
+        p = mpmsub.cluster(p=1, m="1G", verbose=False)
+        late = {"cmd": ["echo", "late"], "id": "late"}
+        p.jobs.append({"cmd": lambda: p.jobs.append(late), "id": "first"})
+
+        p.run()
+
+        assert sorted(job.job_id for job in p.completed_jobs) == ["first", "late"]
+
+    def test_overlapping_runs_restore_logging(self):
+        """Test that clusters running at once leave the log handlers intact."""
+        logger = logging.getLogger("mpmsub")
+        first = mpmsub.cluster(p=1, m="1G", progress_bar=False)
+        second = mpmsub.cluster(p=1, m="1G", progress_bar=False)
+        handlers = logger.handlers[:]
+        first.jobs.append({"cmd": lambda: time.sleep(0.2)})
+        second.jobs.append({"cmd": lambda: time.sleep(0.4)})
+
+        # The first run starts first and also finishes first
+        runs = [threading.Thread(target=c.run) for c in (first, second)]
+        runs[0].start()
+        time.sleep(0.1)
+        runs[1].start()
+        for run in runs:
+            run.join()
+
+        assert logger.handlers == handlers
+
+    @pytest.mark.skipif(
+        not hasattr(os, "sched_setaffinity") or len(os.sched_getaffinity(0)) < 2,
+        reason="needs sched_setaffinity() and two or more cores",
+    )
+    def test_pin_cpus_not_enough_free(self):
+        """Test that a job wanting more cores than are free runs unpinned."""
+        cores = sorted(os.sched_getaffinity(0))
+        p = mpmsub.Cluster(
+            cpus=len(cores) + 1, memory="1G", verbose=False, pin_cpus=True
+        )
+        # The larger-memory job is offered first and takes one core
+        p.jobs.append({"cmd": ["sleep", "0.5"], "m": "10M", "id": "narrow"})
+        show = "import os; print(sorted(os.sched_getaffinity(0)))"
+        p.jobs.append(
+            {"cmd": [sys.executable, "-c", show], "p": len(cores), "id": "wide"}
+        )
+
+        p.run()
+
+        results = {r.job_id: r for r in p.completed_jobs}
+        assert results["wide"].stdout == f"{cores}\n"
+
     def test_job_defaults(self):
         """Test job defaults for p and m."""
         p = mpmsub.cluster(p=2, m="1G")
@@ -128,6 +326,40 @@ class TestCluster:
         assert job3["p"] == 1
         assert job3["m"] == 100
 
+    def test_scheduling_priority(self):
+        """Test that larger jobs are offered resources first."""
+        p = mpmsub.cluster(p=2, m="1G")
+        p.verbose = False
+
+        p.jobs.append({"cmd": ["echo", "small"], "id": "small", "m": "10M"})
+        p.jobs.append({"cmd": ["echo", "big"], "id": "big", "m": "900M"})
+        p.jobs.append({"cmd": ["echo", "wide"], "id": "wide", "p": 2})
+
+        # pending_jobs still reports submission order
+        assert [j["id"] for j in p.job_queue.pending_jobs] == ["small", "big", "wide"]
+
+        # Jobs that do not fit are skipped over, not dropped
+        assert p.job_queue.get_next_job(1, 500)["id"] == "small"
+        assert p.job_queue.get_next_job(2, 1024)["id"] == "big"
+        assert p.job_queue.get_next_job(2, 1024)["id"] == "wide"
+        assert p.job_queue.get_next_job(2, 1024) is None
+
+        # Several jobs are taken at once, each charged against the budget
+        for job_id in ["small", "big", "wide"]:
+            p.jobs.append({"cmd": ["echo", job_id], "id": f"{job_id}2"})
+        taken = p.job_queue.get_next_jobs(2, 1024, 3)
+        assert [j["id"] for j in taken] == ["small2", "big2"]
+        assert [j["id"] for j in p.job_queue.pending_jobs] == ["wide2"]
+
+        # take_matching() only considers the requested shapes
+        p.jobs.append({"cmd": ["echo", "big"], "id": "big3", "m": "900M"})
+        p.jobs.append({"cmd": ["echo", "wide"], "id": "wide3", "p": 2})
+        taken = p.job_queue.take_matching(lambda job: True, 5, 1, 500)
+        assert [j["id"] for j in taken] == ["wide2"]
+        taken = p.job_queue.take_matching(lambda job: True, 5, 1, 1024)
+        assert [j["id"] for j in taken] == ["big3"]
+        assert [j["id"] for j in p.job_queue.pending_jobs] == ["wide3"]
+
     def test_profiling(self):
         """Test profiling functionality."""
         p = mpmsub.cluster(p=2, m="1G")
@@ -149,6 +381,23 @@ class TestCluster:
         assert len(p.completed_jobs) == 2
         assert len(p.job_queue.pending_jobs) == 0
 
+    def test_profiling_concurrent(self):
+        """Test profiling several jobs at once."""
+        p = mpmsub.cluster(p=2, m="1G", progress_bar=False)
+        p.verbose = False
+
+        p.jobs.append({"cmd": ["echo", "first"], "id": "first"})
+        p.jobs.append({"cmd": ["echo", "second"], "id": "second"})
+        p.jobs.append({"cmd": ["echo", "third"], "id": "third"})
+
+        results = p.profile(verbose=False, max_workers=2)
+
+        # Results come back in submission order
+        assert [r.job_id for r in results] == ["first", "second", "third"]
+        assert all(r.success for r in results)
+        assert len(p.completed_jobs) == 3
+        assert len(p.job_queue.running_jobs) == 0
+
     def test_progress_bar(self):
         """Test progress bar functionality."""
         # Test with progress bar enabled
@@ -192,6 +441,12 @@ class TestCluster:
         assert job2.id == "test_job"
         assert job2.timeout == 30.0
 
+        # Dictionary-style access mirrors the attributes
+        assert job2["p"] == 2
+        assert job2["cmd"] == ["echo", "test2"]
+        with pytest.raises(KeyError):
+            job2["missing"]
+
         # Test to_dict conversion
         job_dict = job2.to_dict()
         expected = {
@@ -204,6 +459,7 @@ class TestCluster:
             "timeout": 30.0,
             "stdout": None,
             "stderr": None,
+            "capture_output": True,
         }
         assert job_dict == expected
 
@@ -212,8 +468,14 @@ class TestCluster:
         cluster.jobs.append(job)
         cluster.jobs.append(job2)
 
+        # Subclasses of Job are accepted too
+        class EchoJob(mpmsub.Job):
+            pass
+
+        cluster.jobs.append(EchoJob(["echo", "subclass"]))
+
         results = cluster.run()
-        assert results["jobs"]["completed"] == 2
+        assert results["jobs"]["completed"] == 3
 
     def test_mixed_job_interfaces(self):
         """Test mixing Job objects and dictionaries."""